@@ -0,0 +1,141 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Dynamic micro-batching of embedding calls across concurrent requests.
+
+Every request embeds its own few queries, so under load the embedding NIMs see a stream of
+tiny calls. A MicroBatcher sits in front of one embedding model: callers submit items and
+wait, a worker collects what arrives within a short window (or until the batch is full),
+sends one call for the whole batch and hands each caller its vectors back. Identical items
+in a batch are embedded once.
+"""
+
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+import asyncio
+import logging
+import time
+
+
+class MicroBatcher:
+    """
+    Collects items for up to window seconds or max_batch_size items, whichever comes first,
+    and passes them to handler in one call. handler returns one result per item, in order.
+    Items are queued up to max_queue_size; beyond that, submit() waits (backpressure).
+    Batches are dispatched as soon as they close, so several can be in flight at once.
+    """
+    def __init__(
+        self,
+        handler: Callable[[List[Hashable]], Awaitable[List[Any]]],
+        window: float = 0.002,
+        max_batch_size: int = 64,
+        max_queue_size: int = 1024,
+        name: str = "",
+    ):
+        self.handler = handler
+        self.window = window
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_queue_size = max_queue_size
+        self.name = name
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._inflight: set = set()
+
+        self.batches = 0
+        self.items = 0
+        self.unique_items = 0
+        self.full_batches = 0
+        self.largest_batch = 0
+        self.max_queue_depth = 0
+        self.failed_batches = 0
+        self._wait_seconds = 0.0
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        """Start the worker on the running loop, e.g. again after the previous loop was closed."""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def submit(self, items: List[Hashable]) -> List[Any]:
+        """Embed items as part of whatever batches they land in. Returns results in input order."""
+        if not items:
+            return []
+        queue = self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            future = loop.create_future()
+            await queue.put((item, future, time.monotonic()))
+            futures.append(future)
+        self.max_queue_depth = max(self.max_queue_depth, queue.qsize())
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self) -> None:
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Hashable, asyncio.Future, float]]) -> None:
+        now = time.monotonic()
+        unique = list(dict.fromkeys(item for item, _, _ in batch))
+        self.batches += 1
+        self.items += len(batch)
+        self.unique_items += len(unique)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.full_batches += len(batch) >= self.max_batch_size
+        self._wait_seconds += sum(now - enqueued for _, _, enqueued in batch)
+        try:
+            results = await self.handler(unique)
+            by_item: Dict[Hashable, Any] = dict(zip(unique, results))
+            for item, future, _ in batch:
+                if not future.done():
+                    future.set_result(by_item[item])
+        except Exception as e:
+            self.failed_batches += 1
+            logging.error(f"CATALOG RETRIEVER | MicroBatcher._dispatch() | {self.name} batch of {len(unique)} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def close(self) -> None:
+        """Stop the worker and any batch still in flight."""
+        for task in [self._worker, *self._inflight]:
+            if task is not None and not task.done():
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch sizes, queueing delay and queue depth."""
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "max_queue_size": self.max_queue_size,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "unique_items": self.unique_items,
+            "full_batches": self.full_batches,
+            "failed_batches": self.failed_batches,
+            "largest_batch": self.largest_batch,
+            "mean_batch_size": self.items / self.batches if self.batches else 0.0,
+            "mean_wait_ms": self._wait_seconds * 1000 / self.items if self.items else 0.0,
+        }
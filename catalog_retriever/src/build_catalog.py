@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+build-catalog: embed the catalog CSV once and write a versioned catalog snapshot.
+
+Replicas started with catalog_snapshot pointing at the output directory load the snapshot
+instead of embedding the CSV, so scaling out makes no embedding calls.
+
+    python -m app.build_catalog --output /app/shared/catalog_snapshots [--csv products.csv] [--config config.yaml]
+"""
+
+import argparse
+import logging
+import sys
+
+from .config import DEFAULT_CONFIG_PATH, load_config_with_override
+from .retriever import Retriever, RetrieverConfig
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="build-catalog", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", required=True, help="Snapshot root directory; the snapshot goes to <output>/<version>.")
+    parser.add_argument("--csv", help="Catalog CSV (defaults to data_source from the config).")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH, help="catalog_retriever config.yaml.")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    data = load_config_with_override(args.config)
+    csv_path = args.csv or data["data_source"]
+    # The snapshot is built in process and never touches Milvus or an on-disk index.
+    config = RetrieverConfig(**{
+        **{key: value for key, value in data.items() if key in RetrieverConfig.model_fields},
+        "vector_store": "numpy",
+        "vector_store_path": None,
+        "ingestion_mode": "incremental",
+    })
+
+    retriever = Retriever(config=config)
+    try:
+        retriever.milvus_from_csv(csv_path=csv_path, verbose=args.verbose)
+        path = retriever.export_snapshot(args.output, csv_path=csv_path)
+    finally:
+        retriever.close()
+    logging.info(f"CATALOG RETRIEVER | build_catalog() | Catalog snapshot ready at {path}.")
+    print(path)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
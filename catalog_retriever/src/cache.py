@@ -0,0 +1,171 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+In-process caches used by the catalog retriever.
+
+The LRUCache is shared by every request handled by a retriever replica, so it is
+guarded by a lock and safe to use from the event loop and from worker threads alike.
+SingleFlight complements it for requests that arrive while the first one is still running:
+they wait for that computation instead of starting their own.
+"""
+
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+import asyncio
+import hashlib
+import threading
+import json
+import time
+import re
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe least-recently-used cache with an optional time-to-live.
+    Tracks hits, misses and evictions so they can be reported on the stats endpoint.
+    """
+    def __init__(self, max_size: int = 4096, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value for key, or None on a miss or an expired entry."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            stored_at, value = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insert or refresh key, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry. Counters are kept so hit ratios survive invalidation."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report size and hit/miss counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent async computations with the same key: the first caller starts it,
+    later callers await the same result while it is in flight. The computation runs as its own
+    task, so a cancelled caller (e.g. a disconnected client) does not cancel it for the others.
+    Only used from one event loop, so it needs no lock.
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run fn() unless a call with this key is in flight. Returns (result, shared)."""
+        task = self.join(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.calls += 1
+        return await asyncio.shield(task), shared
+
+    def join(self, key: Hashable) -> asyncio.Task | None:
+        """The in-flight computation for key, counted as coalesced, or None."""
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+        return task
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved when every caller has gone away.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Report computations started, requests coalesced onto them and calls in flight."""
+        requests = self.calls + self.coalesced
+        return {
+            "in_flight": len(self._calls),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": self.coalesced / requests if requests else 0.0,
+        }
+
+
+def normalize_query_text(text: str) -> str:
+    """Collapse whitespace and case so trivially different queries share a cache entry."""
+    return _WHITESPACE.sub(" ", text).strip().casefold()
+
+
+def embedding_cache_key(text: str, model_name: str, input_type: str) -> Tuple[str, str, str]:
+    """Build the cache key for a query embedding."""
+    return (normalize_query_text(text), model_name, input_type)
+
+
+def retrieval_cache_key(
+    catalog_version: int,
+    queries: List[str],
+    categories: List[str],
+    filters: Dict[str, Any] | None,
+    k: int,
+    image_bool: bool,
+    image: str | bytes = "",
+) -> Tuple[Any, ...]:
+    """
+    Build the cache key for a whole retrieval request.
+    Query order is kept since it drives interleaving; categories are a set. Images are keyed by digest.
+    """
+    return (
+        catalog_version,
+        tuple(normalize_query_text(query) for query in queries),
+        tuple(sorted({normalize_query_text(category) for category in categories})),
+        json.dumps(filters or {}, sort_keys=True, default=str),
+        k,
+        image_bool,
+        hashlib.sha256(image if isinstance(image, bytes) else image.encode("utf-8")).hexdigest() if image else "",
+    )
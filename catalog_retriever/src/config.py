@@ -0,0 +1,46 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Configuration loading shared by the service and the build-catalog CLI.
+"""
+
+import logging
+import os
+
+import yaml
+
+DEFAULT_CONFIG_PATH = "/app/shared/configs/catalog_retriever/config.yaml"
+
+# Get our configuration from config.yaml with optional override support
+def load_config_with_override(base_config_path: str):
+    """Load configuration from YAML file with optional override support."""
+    # Load base config
+    if not os.path.exists(base_config_path):
+        logging.error(f"Base config file not found at {base_config_path}")
+        raise FileNotFoundError(f"Base config file not found at {base_config_path}")
+
+    with open(base_config_path, "r") as f:
+        config = yaml.safe_load(f)
+    
+    # Check for override config
+    override_file = os.environ.get("CONFIG_OVERRIDE")
+    if override_file:
+        # Construct override path (same directory as base config)
+        base_dir = os.path.dirname(base_config_path)
+        override_path = os.path.join(base_dir, override_file)
+        
+        if os.path.exists(override_path):
+            logging.info(f"Loading override config from {override_path}")
+            with open(override_path, "r") as f:
+                override_config = yaml.safe_load(f)
+            
+            # Merge override config into base config
+            config.update(override_config)
+            logging.info(f"Config override applied from {override_file}")
+        else:
+            logging.warning(f"Override config file not found at {override_path}")
+    else:
+        logging.info("No config override specified, using base config only")
+    
+    return config
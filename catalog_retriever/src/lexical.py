@@ -0,0 +1,157 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+In-memory lexical search over the catalog.
+
+BM25Index scores product names, descriptions and categories with Okapi BM25 over
+numpy posting lists, so a lookup costs microseconds and needs no embedding call.
+Its hits are combined with vector search results by reciprocal rank fusion.
+"""
+
+from collections import defaultdict
+from typing import Dict, Hashable, List, Tuple
+import math
+import re
+
+from langchain_core.documents import Document
+import numpy as np
+
+from .cache import normalize_query_text
+from .vectorstore import CatalogFilter
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens."""
+    return _TOKEN.findall(text.casefold())
+
+
+class BM25Index:
+    """
+    Okapi BM25 over catalog documents. Documents keep their vector store metadata,
+    including the primary key, so lexical and vector hits can be fused.
+    Given the documents' stored vectors, row-aligned, the index also scores hits against a
+    query vector in process, so fused hits report comparable similarities.
+    """
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75, vectors: np.ndarray | None = None):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        self._vectors = None
+        if vectors is not None and len(vectors) == len(documents):
+            vectors = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._vectors = vectors / np.where(norms == 0, 1, norms)
+        self._rows = {document.metadata.get("pk"): index for index, document in enumerate(documents)}
+
+        postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        self._names: Dict[str, List[int]] = defaultdict(list)
+        for index, document in enumerate(documents):
+            tokens = tokenize(self._indexed_text(document))
+            lengths[index] = len(tokens)
+            for token in tokens:
+                postings[token][index] = postings[token].get(index, 0) + 1
+            name = document.metadata.get("name")
+            if name:
+                self._names[normalize_query_text(str(name))].append(index)
+
+        self._lengths = lengths
+        self._avg_length = float(lengths.mean()) if len(documents) else 0.0
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        for token, counts in postings.items():
+            ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            frequencies = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+            idf = math.log(1 + (len(documents) - len(counts) + 0.5) / (len(counts) + 0.5))
+            self._postings[token] = (ids, frequencies, idf)
+
+        self._columns = (
+            np.array([str(document.metadata.get("category", "")) for document in documents], dtype=object),
+            np.array([str(document.metadata.get("subcategory", "")) for document in documents], dtype=object),
+            np.array([document.metadata.get("price", np.nan) for document in documents], dtype=np.float64),
+        )
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @staticmethod
+    def _indexed_text(document: Document) -> str:
+        metadata = document.metadata
+        fields = [metadata.get(field) for field in ("name", "description", "category", "subcategory")]
+        if not any(fields):
+            return document.page_content
+        return " ".join(str(field) for field in fields if field)
+
+    def _admitted(self, search_filter: CatalogFilter | None) -> np.ndarray | None:
+        if search_filter is None or search_filter.is_empty():
+            return None
+        return search_filter.mask(*self._columns)
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        search_filter: CatalogFilter | None = None,
+    ) -> List[Tuple[Document, float]]:
+        """Top-k documents by BM25 score, restricted to the rows the filter admits."""
+        if not self.documents or k <= 0:
+            return []
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for token in set(tokenize(query)):
+            if token not in self._postings:
+                continue
+            ids, frequencies, idf = self._postings[token]
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[ids] / self._avg_length)
+            scores[ids] += idf * frequencies * (self.k1 + 1) / (frequencies + norm)
+        admitted = self._admitted(search_filter)
+        if admitted is not None:
+            scores[~admitted] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.documents[index], float(scores[index])) for index in candidates]
+
+    def cosine_similarities(self, documents: List[Document], query_vector: np.ndarray) -> List[float | None]:
+        """
+        Cosine similarity of indexed documents to a query vector, from the vectors the index was
+        built with. None for documents without one, e.g. hits of an index that was since rebuilt.
+        """
+        if self._vectors is None:
+            return [None] * len(documents)
+        rows = [self._rows.get(document.metadata.get("pk")) for document in documents]
+        found = [row for row in rows if row is not None]
+        query_vector = np.asarray(query_vector, dtype=np.float32)
+        scores = iter((self._vectors[found] @ query_vector / (np.linalg.norm(query_vector) or 1.0)).tolist())
+        return [None if row is None else next(scores) for row in rows]
+
+    def exact_name(self, query: str, search_filter: CatalogFilter | None = None) -> Document | None:
+        """The document whose product name equals the query (ignoring case and spacing), if any."""
+        indices = self._names.get(normalize_query_text(query))
+        if not indices:
+            return None
+        admitted = self._admitted(search_filter)
+        for index in indices:
+            if admitted is None or admitted[index]:
+                return self.documents[index]
+        return None
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: List[List[Tuple[Document, float]]],
+    k: int = 60,
+) -> List[Tuple[Document, float]]:
+    """
+    Merge ranked (Document, score) lists by reciprocal rank fusion, identifying documents by "pk".
+    Each document keeps the score from the first list it appears in; only the order is fused.
+    """
+    fused: Dict[Hashable, float] = defaultdict(float)
+    first_seen: Dict[Hashable, Tuple[Document, float]] = {}
+    for ranked in ranked_lists:
+        for rank, item in enumerate(ranked):
+            key = item[0].metadata.get("pk")
+            fused[key] += 1.0 / (k + rank + 1)
+            first_seen.setdefault(key, item)
+    return [first_seen[key] for key in sorted(fused, key=lambda key: fused[key], reverse=True)]
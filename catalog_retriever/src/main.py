@@ -1,13 +1,16 @@
 # SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 from app.retriever import Retriever, RetrieverConfig
+from app.config import DEFAULT_CONFIG_PATH, load_config_with_override
 import time
+import asyncio
 import os
-import yaml
+import json
 import logging
 import sys
 
@@ -27,61 +30,51 @@ for entry in os.listdir("."):
     dir_contents.append(entry)
 logging.info(f"CATALOG RETRIEVER | startup | Directory contents: {dir_contents}")
 
-# Get our configuration from config.yaml with optional override support
-def load_config_with_override(base_config_path: str):
-    """Load configuration from YAML file with optional override support."""
-    # Load base config
-    if not os.path.exists(base_config_path):
-        logging.error(f"Base config file not found at {base_config_path}")
-        raise FileNotFoundError(f"Base config file not found at {base_config_path}")
-
-    with open(base_config_path, "r") as f:
-        config = yaml.safe_load(f)
-    
-    # Check for override config
-    override_file = os.environ.get("CONFIG_OVERRIDE")
-    if override_file:
-        # Construct override path (same directory as base config)
-        base_dir = os.path.dirname(base_config_path)
-        override_path = os.path.join(base_dir, override_file)
-        
-        if os.path.exists(override_path):
-            logging.info(f"Loading override config from {override_path}")
-            with open(override_path, "r") as f:
-                override_config = yaml.safe_load(f)
-            
-            # Merge override config into base config
-            config.update(override_config)
-            logging.info(f"Config override applied from {override_file}")
-        else:
-            logging.warning(f"Override config file not found at {override_path}")
-    else:
-        logging.info("No config override specified, using base config only")
-    
-    return config
-
-data = load_config_with_override("/app/shared/configs/catalog_retriever/config.yaml")
+data = load_config_with_override(DEFAULT_CONFIG_PATH)
 
 
 # Setup Retriever once when app starts
-config = RetrieverConfig(  
-    text_embed_port=data["text_embed_port"],
-    image_embed_port=data["image_embed_port"],
-    text_model_name=data["text_model_name"],
-    image_model_name=data["image_model_name"],
-    db_port=data["db_port"],
-    db_name=data["db_name"],
-    sim_threshold=data["sim_threshold"],
-    text_collection=data["text_collection"],
-    image_collection=data["image_collection"]
+# Tuning knobs are optional in config.yaml; anything left out keeps its RetrieverConfig default.
+config = RetrieverConfig(
+    **{key: value for key, value in data.items() if key in RetrieverConfig.model_fields}
 )
 
 logging.info("CATALOG RETRIEVER | startup | config.yaml ingested.")
 logging.info("CATALOG RETRIEVER | startup | Initializing Retriever object.")
 retriever = Retriever(config=config)
-logging.info("CATALOG RETRIEVER | startup | Checking and populating Milvus database if needed.")
-retriever.milvus_from_csv(csv_path=data["data_source"], verbose=True)
-logging.info("CATALOG RETRIEVER | startup | Milvus database ready.")
+
+# Ingestion and warm-up run in the background after startup, so /health/live answers at once
+# and /health/ready only succeeds once the catalog is loaded and searches are fast.
+readiness: Dict[str, Any] = {"state": "starting", "error": None, "ready_at": None}
+started_at = time.time()
+
+async def warm_up():
+    """Populate the vector database if needed, then warm up the search path."""
+    try:
+        if config.catalog_snapshot and os.path.exists(config.catalog_snapshot):
+            readiness["state"] = "loading_snapshot"
+            logging.info(f"CATALOG RETRIEVER | warm_up() | Loading catalog snapshot from {config.catalog_snapshot}.")
+            await retriever.aload_snapshot(config.catalog_snapshot, csv_path=data["data_source"], verbose=True)
+        else:
+            if config.catalog_snapshot:
+                logging.warning(f"CATALOG RETRIEVER | warm_up() | No catalog snapshot at {config.catalog_snapshot}, ingesting the CSV.")
+            readiness["state"] = "ingesting"
+            logging.info("CATALOG RETRIEVER | warm_up() | Checking and populating Milvus database if needed.")
+            await retriever.amilvus_from_csv(csv_path=data["data_source"], verbose=True)
+        readiness["state"] = "warming"
+        await retriever.warm_up(config.warmup_queries)
+        readiness["state"] = "ready"
+        readiness["ready_at"] = time.time()
+        logging.info(f"CATALOG RETRIEVER | warm_up() | Ready {readiness['ready_at'] - started_at:.1f}s after startup.")
+    except Exception as e:
+        readiness["state"] = "failed"
+        readiness["error"] = str(e)
+        logging.exception(f"CATALOG RETRIEVER | warm_up() | Startup failed: {e}")
+
+def require_ready():
+    """Reject queries until warm-up has finished."""
+    if readiness["state"] != "ready":
+        raise HTTPException(status_code=503, detail=f"Catalog retriever is not ready ({readiness['state']})")
 
 # Request bodies
 class TextQueryRequest(BaseModel):
@@ -97,45 +90,163 @@ class ImageQueryRequest(BaseModel):
     filters: Dict[str, Any] = Field(default_factory=dict)
     k: int = 4
 
+class BatchQueryItem(BaseModel):
+    text: List[str] = []
+    image_base64: str = ""
+    categories: List[str] = []
+    filters: Dict[str, Any] = Field(default_factory=dict)
+    k: int = 4
+
+class BatchQueryRequest(BaseModel):
+    queries: List[BatchQueryItem] = []
+
 # Handles queries only containing text.
 @app.post("/query/text")
 async def query_text(req: TextQueryRequest):
+    require_ready()
     logging.info(f"CATALOG RETRIEVER | query_text() | Received POST: {req}.")
+    stats = {}
     texts, ids, sims, names, images = await retriever.retrieve(
         query=req.text,
         categories=req.categories,
         filters=req.filters,
         k=req.k,
         image_bool=False,
-        verbose=True
+        verbose=True,
+        stats=stats
     )
     return {
         "texts": texts,
         "ids": ids,
         "similarities": sims,
         "names": names,
-        "images": images
+        "images": images,
+        "stats": stats
+    }
+
+def image_request_fields(params) -> Dict[str, Any]:
+    """
+    Read the non-image fields of an image query from form fields or query parameters.
+    text and categories may repeat, filters is a JSON object.
+    """
+    fields: Dict[str, Any] = {
+        "text": params.getlist("text"),
+        "categories": params.getlist("categories"),
     }
+    if params.get("filters"):
+        fields["filters"] = json.loads(params.get("filters"))
+    if params.get("k"):
+        fields["k"] = int(params.get("k"))
+    return fields
 
-# Handles queries containing text and b64 images.
+# Handles queries containing text and an image. The image can be sent as
+# - JSON with a base64 image_base64 field,
+# - multipart/form-data with an "image" file part and the other fields as form fields, or
+# - a raw application/octet-stream body with the other fields as query parameters.
+# Binary uploads skip the base64 inflation and are decoded exactly once.
 @app.post("/query/image")
-async def query_image(req: ImageQueryRequest):
+async def query_image(request: Request):
+    require_ready()
     logging.info(f"CATALOG RETRIEVER | query_image() | Received POST.")
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("image")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=422, detail="Missing 'image' file part")
+            req = ImageQueryRequest(**image_request_fields(form))
+            image = await upload.read()
+        elif content_type.startswith("application/octet-stream"):
+            req = ImageQueryRequest(**image_request_fields(request.query_params))
+            image = await request.body()
+        else:
+            req = ImageQueryRequest.model_validate(await request.json())
+            image = req.image_base64
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    stats = {}
     texts, ids, sims, names, images = await retriever.retrieve(
         query=req.text,
-        image=req.image_base64,
+        image=image,
         categories=req.categories,
         filters=req.filters,
         k=req.k,
         image_bool=True,
-        verbose=True
+        verbose=True,
+        stats=stats
     )
     return {
         "texts": texts,
         "ids": ids,
         "similarities": sims,
         "names": names,
-        "images": images
+        "images": images,
+        "stats": stats
+    }
+
+# Handles many text and/or image queries in one request.
+# Items with an image are answered like /query/image, the others like /query/text.
+@app.post("/query/batch")
+async def query_batch(req: BatchQueryRequest):
+    require_ready()
+    logging.info(f"CATALOG RETRIEVER | query_batch() | Received POST with {len(req.queries)} queries.")
+    batch = await retriever.retrieve_batch(
+        [
+            {
+                "query": item.text,
+                "image": item.image_base64,
+                "categories": item.categories,
+                "filters": item.filters,
+                "k": item.k,
+                "image_bool": bool(item.image_base64),
+            }
+            for item in req.queries
+        ],
+        verbose=False
+    )
+    return {
+        "results": [
+            {
+                "texts": texts,
+                "ids": ids,
+                "similarities": sims,
+                "names": names,
+                "images": images,
+                "stats": stats
+            }
+            for (texts, ids, sims, names, images), stats in batch
+        ]
+    }
+
+@app.on_event("startup")
+async def startup():
+    """Start ingestion and warm-up without holding up the server."""
+    app.state.warm_up_task = asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+def shutdown():
+    """Stop warm-up and the image worker processes."""
+    app.state.warm_up_task.cancel()
+    retriever.close()
+
+@app.get("/stats")
+async def stats():
+    """Cache and search statistics for this replica."""
+    return {
+        "embedding_cache": retriever.embed_cache.stats(),
+        "result_cache": retriever.result_cache.stats(),
+        "coalescing": retriever.in_flight.stats(),
+        "image_embedding_cache": retriever.image_embed_cache.stats(),
+        "embedding_batches": {
+            **{f"text_{name}": batcher.stats() for name, batcher in retriever.text_batchers.items()},
+            "image": retriever.image_batcher.stats()
+        },
+        "catalog_image_hits": retriever.catalog_image_hits,
+        "lexical_shortcuts": retriever.lexical_shortcuts,
+        "catalog_version": retriever.catalog_version,
+        "search_rounds": dict(retriever.fetch_rounds)
     }
 
 @app.get("/health")
@@ -146,3 +257,18 @@ async def health_check():
         "timestamp": time.time(),
         "version": "1.0.0"
     }
+
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the server is up. Fails only if ingestion or warm-up failed, so the container is restarted."""
+    if readiness["state"] == "failed":
+        return JSONResponse(status_code=503, content={"status": "failed", "error": readiness["error"]})
+    return {"status": "alive", "timestamp": time.time()}
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness: the catalog is ingested, the collections are loaded and warm-up queries have run."""
+    body = {"status": readiness["state"], "uptime": time.time() - started_at}
+    if readiness["state"] != "ready":
+        return JSONResponse(status_code=503, content=body)
+    return {**body, "warm_up_seconds": readiness["ready_at"] - started_at}
@@ -0,0 +1,154 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Vectorized fusion and ranking of search candidates.
+
+Candidates from every per-query and per-modality result list are held as parallel
+NumPy arrays of (pk, score, source, rank). A RankingStrategy turns them into one
+deduplicated order with array operations only:
+
+- "round_robin": interleave the lists rank by rank, as text retrieval always has.
+- "max_score":   order by similarity, as image retrieval always has.
+- "rrf":         reciprocal rank fusion over the lists.
+- "weighted":    order by similarity scaled by a per-modality weight.
+"""
+
+from abc import ABC, abstractmethod
+from itertools import chain
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+TEXT_SOURCE = 0
+IMAGE_SOURCE = 1
+
+
+class Candidates:
+    """
+    Flattened search hits. Index i of every array describes items[i], a (Document, score) tuple.
+    """
+    def __init__(
+        self,
+        result_lists: Sequence[Sequence[Tuple[Any, float]]],
+        sources: Sequence[int] | None = None,
+    ):
+        sources = sources if sources is not None else [TEXT_SOURCE] * len(result_lists)
+        sizes = np.fromiter((len(hits) for hits in result_lists), dtype=np.int64, count=len(result_lists))
+        self.items: List[Tuple[Any, float]] = list(chain.from_iterable(result_lists))
+        self.lists = np.repeat(np.arange(len(result_lists)), sizes)
+        self.sources = np.repeat(np.asarray(sources, dtype=np.int8), sizes)
+        starts = np.repeat(np.cumsum(sizes) - sizes, sizes)
+        self.ranks = np.arange(len(self.items)) - starts
+        documents, scores = zip(*self.items) if self.items else ((), ())
+        self.scores = np.array(scores, dtype=np.float64)
+        self.pks = self._pk_codes([document.metadata.get("pk") for document in documents])
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @staticmethod
+    def _pk_codes(pks: List[Any]) -> np.ndarray:
+        """
+        Non-negative integer key per primary key, so deduplication runs on arrays.
+        Integer primary keys are used as they are. Items without a pk get -1.
+        """
+        values = np.array(pks)
+        if values.dtype.kind in "iu" and (not len(values) or values.min() >= 0):
+            return values.astype(np.int64, copy=False)
+        codes: Dict[Any, int] = {}
+        return np.array([-1 if pk is None else codes.setdefault(str(pk), len(codes)) for pk in pks], dtype=np.int64)
+
+
+def dedupe(candidates: Candidates, order: np.ndarray) -> np.ndarray:
+    """Keep the first occurrence of every pk in order, dropping items without a pk."""
+    order = order[candidates.pks[order] >= 0]
+    _, first = np.unique(candidates.pks[order], return_index=True)
+    return order[np.sort(first)]
+
+
+class RankingStrategy(ABC):
+    """Orders candidates. Subclasses return item indices, best first, one per pk."""
+    name = ""
+
+    @abstractmethod
+    def order(self, candidates: Candidates) -> np.ndarray:
+        ...
+
+
+class RoundRobin(RankingStrategy):
+    """Take the best remaining hit of each list in turn."""
+    name = "round_robin"
+
+    def order(self, candidates: Candidates) -> np.ndarray:
+        return dedupe(candidates, np.lexsort((candidates.lists, candidates.ranks)))
+
+
+class MaxScore(RankingStrategy):
+    """Order every hit by similarity; a product keeps its best-scoring hit."""
+    name = "max_score"
+
+    def order(self, candidates: Candidates) -> np.ndarray:
+        return dedupe(candidates, np.argsort(-candidates.scores, kind="stable"))
+
+
+class ReciprocalRankFusion(RankingStrategy):
+    """Order products by the sum of 1 / (k + rank) over the lists that returned them."""
+    name = "rrf"
+
+    def __init__(self, k: int = 60):
+        self.k = k
+
+    def order(self, candidates: Candidates) -> np.ndarray:
+        valid = np.flatnonzero(candidates.pks >= 0)
+        if not len(valid):
+            return valid
+        unique_pks, codes = np.unique(candidates.pks[valid], return_inverse=True)
+        fused = np.bincount(codes, weights=1.0 / (self.k + candidates.ranks[valid] + 1))
+        # Represent each product by its best-scoring hit, then order products by fused score.
+        best_first = valid[np.argsort(-candidates.scores[valid], kind="stable")]
+        representatives = dedupe(candidates, best_first)
+        representative_codes = np.searchsorted(unique_pks, candidates.pks[representatives])
+        return representatives[np.argsort(-fused[representative_codes], kind="stable")]
+
+
+class Weighted(RankingStrategy):
+    """Order by similarity scaled per modality, e.g. to favour image hits for image queries."""
+    name = "weighted"
+
+    def __init__(self, text_weight: float = 1.0, image_weight: float = 1.0):
+        self.weights = np.array([text_weight, image_weight], dtype=np.float64)
+
+    def order(self, candidates: Candidates) -> np.ndarray:
+        weighted = candidates.scores * self.weights[candidates.sources]
+        return dedupe(candidates, np.argsort(-weighted, kind="stable"))
+
+
+def get_strategy(name: str, rrf_k: int = 60, text_weight: float = 1.0, image_weight: float = 1.0) -> RankingStrategy:
+    """Build a ranking strategy by name."""
+    if name == RoundRobin.name:
+        return RoundRobin()
+    if name == MaxScore.name:
+        return MaxScore()
+    if name == ReciprocalRankFusion.name:
+        return ReciprocalRankFusion(k=rrf_k)
+    if name == Weighted.name:
+        return Weighted(text_weight=text_weight, image_weight=image_weight)
+    raise ValueError(f"Unsupported ranking strategy '{name}', expected 'round_robin', 'max_score', 'rrf' or 'weighted'")
+
+
+def rank(
+    candidates: Candidates,
+    strategy: RankingStrategy,
+    threshold: float,
+) -> np.ndarray:
+    """Deduplicated candidate order under the strategy, keeping only scores above threshold."""
+    order = strategy.order(candidates)
+    return order[candidates.scores[order] > threshold]
+
+
+def top_k_by_score(candidates: Candidates, selected: Sequence[int], k: int) -> List[Tuple[Any, float]]:
+    """The first k selected items, presented by descending similarity."""
+    selected = np.asarray(selected[:k], dtype=np.int64)
+    selected = selected[np.argsort(-candidates.scores[selected], kind="stable")]
+    return [candidates.items[i] for i in selected]
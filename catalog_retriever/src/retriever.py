@@ -8,21 +8,34 @@ The second model uses text embeddings to retrieve relevant products.
 Performs both of these in parallel and then re-ranks the results from bothmodels.
 """
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from pydantic import BaseModel
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Set
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.embeddings import Embeddings
-from langchain_milvus import Milvus
+from pymilvus import DataType
 import os
 import sys
 import re
 import pandas as pd
+import hashlib
+import json
+import time
 import numpy as np
 from numpy import mean
-from .utils import image_url_to_base64, is_url, is_path, image_path_to_base64, resize_base64_image
+from .utils import prepare_image_input, prepare_query_image, catalog_image_dhash
+from .batcher import MicroBatcher
+from .cache import LRUCache, SingleFlight, embedding_cache_key, retrieval_cache_key
+from .lexical import BM25Index, reciprocal_rank_fusion
+from .ranking import Candidates, IMAGE_SOURCE, TEXT_SOURCE, get_strategy, rank, top_k_by_score
+from .snapshot import CatalogSnapshot, file_sha256, write_snapshot
+from .vectorstore import CatalogFilter, CatalogMilvus, NumpyVectorStore, CONTENT_HASH_FIELD, IMAGE_HASH_FIELD, PARTITION_FIELD
 import logging
 import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice, repeat
+from collections import Counter
 
 # Set up logging 
 logging.basicConfig(
@@ -42,6 +55,37 @@ class RetrieverConfig(BaseModel):
     sim_threshold: float
     text_collection: str
     image_collection: str
+    embed_cache_size: int = 4096
+    embed_cache_ttl: float | None = 3600.0
+    max_inflight_requests: int = 64
+    vector_store: str = "milvus"
+    vector_store_path: str | None = None
+    ingestion_mode: str = "incremental"
+    ingest_batch_size: int = 32
+    ingest_concurrency: int = 4
+    ingest_insert_batch_size: int = 512
+    ingest_queue_size: int = 8
+    image_workers: int | None = None
+    fetch_growth: float = 2.0
+    result_cache_size: int = 2048
+    result_cache_ttl: float | None = 300.0
+    max_fetch_limit: int = 256
+    embed_batch_size: int = 64
+    embed_batch_window_ms: float = 2.0
+    embed_queue_size: int = 1024
+    image_cache_size: int = 1024
+    image_hash_distance: int = 4
+    lexical_search: bool = True
+    rrf_k: int = 60
+    text_ranking: str = "round_robin"
+    image_ranking: str = "max_score"
+    text_weight: float = 1.0
+    image_weight: float = 1.0
+    warmup_queries: List[str] = ["summer dress", "leather handbag", "running shoes", "gold necklace"]
+    catalog_snapshot: str | None = None
+    coalesce_requests: bool = True
+    category_partitions: bool = True
+    num_partitions: int = 64
 
 # Defines a type for storing and embedding text.
 class TextEmbeddings(Embeddings):
@@ -49,11 +93,9 @@ class TextEmbeddings(Embeddings):
         self.retriever = retriever
 
     def embed_query(self, text: str) -> List[float]:
-        """Generate text embedding for a single text"""
+        """Generate text embedding for a single text, served from the query cache when possible"""
         logging.info(f"TextEmbeddings | embed_query() | called.\n\t| input: {text[:50]}")
-        res = self.retriever.embed_chunk(text)
-        normed = res / np.linalg.norm(res)
-        return normed
+        return self.retriever.embed_queries([text])[0]
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """Generate text embeddings for multiple texts"""
@@ -83,6 +125,36 @@ class ImageEmbeddings(Embeddings):
         logging.info(f"ImageEmbeddings | embed_query() | called.")
         return self.retriever.image_embeddings(texts)
 
+class RetrievalPlan:
+    """
+    Search inputs resolved from one retrieval request, and the limits reached by its search rounds.
+    """
+    def __init__(
+        self,
+        queries: List[str],
+        categories: List[str],
+        filters: Dict[str, Any] | None,
+        k: int,
+        image_bool: bool,
+        image: str | bytes,
+        text_filter: CatalogFilter | None,
+        image_filter: CatalogFilter | None
+    ):
+        self.queries = queries
+        self.categories = categories
+        self.filters = filters
+        self.k = k
+        self.image_bool = image_bool
+        self.image = image
+        self.text_filter = text_filter
+        self.image_filter = image_filter
+        self.text_limit = k if image_bool else k*len(queries)
+        self.image_limit = k*len(queries) if image_bool else 0
+        self.rounds = 0
+        # Per-query BM25 hits and exact product-name matches, for text-only requests.
+        self.lexical_hits: List[List[Tuple[Any, float]]] | None = None
+        self.exact_hits: List[Any] | None = None
+
 class Retriever:
     """
     This class defines the core functionality of the retrieval container.
@@ -100,9 +172,15 @@ class Retriever:
         self.sim_threshold = config.sim_threshold
         self.text_collection = config.text_collection
         self.image_collection = config.image_collection
+        self.ingestion_mode = config.ingestion_mode
+        self.ingest_batch_size = config.ingest_batch_size
+        self.ingest_concurrency = config.ingest_concurrency
+        self.ingest_insert_batch_size = config.ingest_insert_batch_size
+        self.ingest_queue_size = config.ingest_queue_size
 
         # Keys.
         embed_key = os.environ["EMBED_API_KEY"]
+        self.embed_key = embed_key
 
         self.text_client = OpenAI(
             api_key=embed_key,
@@ -113,30 +191,142 @@ class Retriever:
             base_url=self.image_embed_port
         )
 
+        # Async clients used on the query path, so searches never occupy an executor thread.
+        self.async_text_client = AsyncOpenAI(
+            api_key=embed_key,
+            base_url=self.text_embed_port
+        )
+        self.async_image_client = AsyncOpenAI(
+            api_key=embed_key,
+            base_url=self.image_embed_port
+        )
+        # Caps the number of embedding and Milvus calls in flight for the whole replica.
+        self.upstream_limit = asyncio.Semaphore(config.max_inflight_requests)
+
+        # Query embedding cache shared by every text search, including cart name lookups.
+        self.embed_cache = LRUCache(
+            max_size=config.embed_cache_size,
+            ttl=config.embed_cache_ttl
+        )
+
+        # Query image embeddings keyed on a perceptual hash of the downscaled image, plus the
+        # hashes of the catalog images, so repeated uploads and photos of our own products skip NVCLIP.
+        self.image_embed_cache = LRUCache(
+            max_size=config.image_cache_size,
+            ttl=config.embed_cache_ttl
+        )
+        self.image_hash_distance = config.image_hash_distance
+        # (catalog images, their hashes, their stored vectors), row-aligned and replaced as a whole.
+        self.catalog_images: Tuple[List[str], np.ndarray, List[np.ndarray]] = ([], np.zeros(0, dtype=np.uint64), [])
+        self.catalog_image_hits = 0
+
+        # BM25 index over the stored text entities, built at ingestion and fused with vector search.
+        self.lexical_search = config.lexical_search
+        self.rrf_k = config.rrf_k
+        self.lexical_index: BM25Index | None = None
+        self.lexical_shortcuts = 0
+
+        # How per-query and per-modality hit lists are merged into one ranking.
+        self.text_ranking = get_strategy(config.text_ranking, config.rrf_k, config.text_weight, config.image_weight)
+        self.image_ranking = get_strategy(config.image_ranking, config.rrf_k, config.text_weight, config.image_weight)
+
+        # Whole-response cache for repeated requests. Keys include catalog_version, which
+        # ingestion bumps, so a catalog change never serves stale products.
+        self.result_cache = LRUCache(
+            max_size=config.result_cache_size,
+            ttl=config.result_cache_ttl
+        )
+        self.catalog_version = 0
+        # Concurrent identical requests that miss the result cache share one computation.
+        self.coalesce_requests = config.coalesce_requests
+        self.in_flight = SingleFlight()
+
+        # Image decode/resize/re-encode is CPU bound, so it runs in worker processes sized to the cores.
+        # Workers are spawned rather than forked, since the gRPC threads of the Milvus client do not survive fork.
+        self.image_workers = config.image_workers or os.cpu_count() or 1
+        self.image_pool = ProcessPoolExecutor(
+            max_workers=self.image_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
         # Create embedding classes
         self.text_embeddings_obj = TextEmbeddings(self)
         self.image_embeddings_obj = ImageEmbeddings(self)
 
-        logging.info(f"CATALOG RETRIEVER | Retriever.__init__() | Initializing Milvus connections.")
+        logging.info(f"CATALOG RETRIEVER | Retriever.__init__() | Initializing {config.vector_store} vector stores.")
+
+        self.vector_store = config.vector_store
+        self.vector_store_path = config.vector_store_path
+        # Products are partitioned by category, so category-restricted searches only scan their categories.
+        self.category_partitions = config.category_partitions
+        self.num_partitions = config.num_partitions
+        self.text_db = self._create_vector_store(self.text_embeddings_obj, self.text_collection)
+        self.image_db = self._create_vector_store(self.image_embeddings_obj, self.image_collection)
+
+        # Adaptive over-fetch: how fast and how far a starved search is deepened.
+        self.fetch_growth = config.fetch_growth
+        self.max_fetch_limit = config.max_fetch_limit
+        self.fetch_rounds: Counter = Counter()
+        self.embed_batch_size = config.embed_batch_size
+
+        # Query-time embedding calls from concurrent requests are merged into batches of up to
+        # embed_batch_size, collected for at most embed_batch_window_ms.
+        self.embed_batch_window = config.embed_batch_window_ms / 1000
+        self.embed_queue_size = config.embed_queue_size
+        self.text_batchers: Dict[str, MicroBatcher] = {}
+        self.image_batcher = MicroBatcher(
+            self._embed_image_payloads,
+            window=self.embed_batch_window,
+            max_batch_size=self.embed_batch_size,
+            max_queue_size=self.embed_queue_size,
+            name="image",
+        )
+
+        # Normalized category and subcategory values in the catalog, filled at ingestion.
+        # Used to resolve the partial category matches of a query into exact filter values,
+        # and each value into the categories (partitions) that hold it.
+        self.category_vocabulary: Set[str] = set()
+        self.category_partition_map: Dict[str, Set[str]] = {}
 
+        logging.info(f"CATALOG RETRIEVER | Retriever.__init__() | Vector stores initialized.")
 
+    def _create_vector_store(self, embedding_function: Embeddings, collection_name: str):
+        """
+        Build the configured vector store backend for one collection.
+        "milvus" talks to the Milvus server, "numpy" keeps the index in process.
+        """
+        if self.vector_store == "numpy":
+            path = os.path.join(self.vector_store_path, collection_name) if self.vector_store_path else None
+            return NumpyVectorStore(embedding_function=embedding_function, path=path)
+        if self.vector_store != "milvus":
+            raise ValueError(f"Unsupported vector_store '{self.vector_store}', expected 'milvus' or 'numpy'")
         # Initialize Milvus with embedding classes
-        self.text_db = Milvus(
-            embedding_function=self.text_embeddings_obj,
-            collection_name=self.text_collection,
-            connection_args={"uri": f"{self.db_port}"},
-            auto_id=True,
-            index_params={"metric_type": "COSINE"},
-        )
-        self.image_db = Milvus(
-            embedding_function=self.image_embeddings_obj,
-            collection_name=self.image_collection,
+        partitioning = {}
+        if self.category_partitions:
+            # Category is a partition key: Milvus hashes it into num_partitions partitions and
+            # prunes the partitions a "category in [...]" filter excludes.
+            partitioning = {
+                "metadata_schema": {
+                    PARTITION_FIELD: {"dtype": DataType.VARCHAR, "kwargs": {"max_length": 65_535, "is_partition_key": True}}
+                },
+                "num_partitions": self.num_partitions,
+            }
+        return CatalogMilvus(
+            embedding_function=embedding_function,
+            collection_name=collection_name,
             connection_args={"uri": f"{self.db_port}"},
             auto_id=True,
             index_params={"metric_type": "COSINE"},
+            **partitioning,
         )
 
-        logging.info(f"CATALOG RETRIEVER | Retriever.__init__() | Milvus collections initialized.")
+    def close(self) -> None:
+        """
+        Release resources that outlive a request, such as the image worker processes.
+        """
+        self.image_pool.shutdown(wait=False, cancel_futures=True)
+        for batcher in [*self.text_batchers.values(), self.image_batcher]:
+            batcher.close()
 
     def embeddings_exist(self) -> bool:
         """
@@ -144,15 +334,8 @@ class Retriever:
         Returns True if both collections have data, False otherwise.
         """
         try:
-            text_count = 0
-            if self.text_db.col:
-                self.text_db.col.flush()
-                text_count = self.text_db.col.num_entities
-
-            image_count = 0
-            if self.image_db.col:
-                self.image_db.col.flush()
-                image_count = self.image_db.col.num_entities
+            text_count = self.text_db.count_entities()
+            image_count = self.image_db.count_entities()
             
             logging.info(f"CATALOG RETRIEVER | embeddings_exist() | Text collection has {text_count} entities. Image collection has {image_count} entities.")
             # Check text and image collections
@@ -186,6 +369,266 @@ class Retriever:
 
         return response.data[0].embedding   
 
+    def _cached_query_vectors(
+        self,
+        queries: List[str],
+        query_type: str
+        ) -> Tuple[List[Any], List[np.ndarray | None], Dict[Any, str]]:
+        """
+        Look up query vectors in the cache.
+        Returns the cache keys, the cached vectors (None on a miss) and the deduplicated misses.
+        """
+        keys = [embedding_cache_key(query, self.text_model_name, query_type) for query in queries]
+        vectors = [self.embed_cache.get(key) for key in keys]
+
+        # Deduplicate misses so repeated entities cost a single embedding.
+        missing: Dict[Any, str] = {}
+        for key, query, vector in zip(keys, queries, vectors):
+            if vector is None and key not in missing:
+                missing[key] = query
+        return keys, vectors, missing
+
+    def _store_query_vectors(
+        self,
+        keys: List[Any],
+        vectors: List[np.ndarray | None],
+        missing: Dict[Any, str],
+        embeddings: List[List[float]]
+        ) -> List[np.ndarray]:
+        """
+        Normalize freshly embedded vectors, cache them and merge them with the cache hits.
+        """
+        fresh = {}
+        for key, embedding in zip(missing, embeddings):
+            normed = np.asarray(embedding, dtype=np.float32)
+            normed = normed / np.linalg.norm(normed)
+            # Cached vectors are shared between requests, so make them read-only.
+            normed.setflags(write=False)
+            self.embed_cache.put(key, normed)
+            fresh[key] = normed
+        return [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+
+    def embed_queries(
+        self,
+        queries: List[str],
+        query_type: str = "query"
+        ) -> List[np.ndarray]:
+        """
+        Embed several queries with at most one batched embedding call.
+        Cached vectors are reused and only the misses are sent to the embedding NIM.
+        Returns normalized, read-only vectors in input order.
+        """
+        keys, vectors, missing = self._cached_query_vectors(queries, query_type)
+        if not missing:
+            return vectors
+
+        response = self.text_client.embeddings.create(
+            input=list(missing.values()),
+            model=self.text_model_name,
+            encoding_format="float",
+            extra_body={"input_type": query_type, "truncate": "NONE"}
+        )
+        logging.info(f"CATALOG RETRIEVER | Retriever.embed_queries() | Embedded {len(missing)} of {len(queries)} queries in one call.")
+        return self._store_query_vectors(keys, vectors, missing, [item.embedding for item in response.data])
+
+    async def aembed_queries(
+        self,
+        queries: List[str],
+        query_type: str = "query"
+        ) -> List[np.ndarray]:
+        """
+        Async counterpart of embed_queries().
+        Misses go through the micro-batcher, so they share embedding calls with concurrent
+        requests; large query lists, such as batch requests, span several calls of embed_batch_size.
+        """
+        keys, vectors, missing = self._cached_query_vectors(queries, query_type)
+        if not missing:
+            return vectors
+
+        embeddings = await self._text_batcher(query_type).submit(list(missing.values()))
+        return self._store_query_vectors(keys, vectors, missing, embeddings)
+
+    def _text_batcher(self, query_type: str) -> MicroBatcher:
+        """The micro-batcher for one input type; an embedding call carries a single input_type."""
+        if query_type not in self.text_batchers:
+            self.text_batchers[query_type] = MicroBatcher(
+                lambda texts: self._embed_query_texts(texts, query_type),
+                window=self.embed_batch_window,
+                max_batch_size=self.embed_batch_size,
+                max_queue_size=self.embed_queue_size,
+                name=f"text:{query_type}",
+            )
+        return self.text_batchers[query_type]
+
+    async def _embed_query_texts(self, texts: List[str], query_type: str) -> List[List[float]]:
+        """One text embedding call; the handler of the text micro-batchers."""
+        async with self.upstream_limit:
+            response = await self.async_text_client.embeddings.create(
+                input=texts,
+                model=self.text_model_name,
+                encoding_format="float",
+                extra_body={"input_type": query_type, "truncate": "NONE"}
+            )
+        logging.info(f"CATALOG RETRIEVER | Retriever.aembed_queries() | Embedded {len(texts)} queries in one call.")
+        return [item.embedding for item in response.data]
+
+    async def _embed_image_payloads(self, payloads: List[str]) -> List[List[float]]:
+        """One image embedding call for prepared image payloads; the handler of the image micro-batcher."""
+        async with self.upstream_limit:
+            response = await self.async_image_client.embeddings.create(
+                input=payloads,
+                model=self.image_model_name,
+                encoding_format="float",
+            )
+        return [d.embedding for d in response.data]
+
+    async def aembed_image(
+        self,
+        image: str | bytes,
+        verbose: bool = False
+        ) -> List[float]:
+        """
+        Embed a single query image with the async image client.
+        """
+        vector = (await self.aembed_images([image], verbose=verbose))[0]
+        if vector is None:
+            logging.error(f"CATALOG RETRIEVER | Retriever.aembed_image() | Failed to prepare image for embedding")
+            raise ValueError("Failed to generate image embedding")
+        return vector
+
+    async def aembed_images(
+        self,
+        images: List[str | bytes],
+        verbose: bool = False
+        ) -> List[List[float] | None]:
+        """
+        Embed query images through the image micro-batcher, in calls of up to embed_batch_size.
+        Uploaded bytes are decoded and downscaled exactly once, in a worker process, which also
+        computes a perceptual hash. Images whose hash was seen before are served from the image
+        cache, and images matching a catalog image reuse its stored vector; neither calls the NIM.
+        Returns one embedding per image, in input order, or None for images that could not be prepared.
+        """
+        # Decoding and resizing is CPU bound, so fan it out to the worker processes.
+        loop = asyncio.get_running_loop()
+        prepared = await asyncio.gather(
+            *(loop.run_in_executor(self.image_pool, prepare_query_image, image, verbose) for image in images)
+        )
+        embeddings: List[Any] = [self.image_embed_cache.get(image_hash) if image_hash is not None else None
+                                 for _, image_hash in prepared]
+
+        # Uploads of our own product photos reuse the catalog vector.
+        for i, (payload, image_hash) in enumerate(prepared):
+            if embeddings[i] is None and image_hash is not None:
+                match = self._match_catalog_image(image_hash)
+                if match is not None:
+                    embeddings[i] = self._store_image_vector(image_hash, match)
+                    self.catalog_image_hits += 1
+
+        # Identical uploads within the batch share one embedding.
+        pending: Dict[Any, List[int]] = {}
+        for i, (payload, image_hash) in enumerate(prepared):
+            if embeddings[i] is None and payload is not None:
+                pending.setdefault(image_hash if image_hash is not None else ("unhashed", i), []).append(i)
+        groups = list(pending.values())
+
+        # The image micro-batcher merges these with the images of concurrent requests.
+        fresh = await self.image_batcher.submit([prepared[group[0]][0] for group in groups])
+        for group, embedding in zip(groups, fresh):
+            vector = self._store_image_vector(prepared[group[0]][1], embedding)
+            for i in group:
+                embeddings[i] = vector
+        return embeddings
+
+    def _store_image_vector(self, image_hash: int | None, embedding: Any) -> np.ndarray:
+        """
+        Cache an image vector under its perceptual hash, as a read-only float32 array.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector.setflags(write=False)
+        if image_hash is not None:
+            self.image_embed_cache.put(image_hash, vector)
+        return vector
+
+    def _match_catalog_image(self, image_hash: int) -> np.ndarray | None:
+        """
+        Stored vector of the catalog image whose hash is within image_hash_distance bits of the query hash, if any.
+        """
+        _, hashes, vectors = self.catalog_images
+        if self.image_hash_distance < 0 or not len(hashes):
+            return None
+        distances = np.bitwise_count(hashes ^ np.uint64(image_hash))
+        best = int(np.argmin(distances))
+        if distances[best] > self.image_hash_distance:
+            return None
+        return vectors[best]
+
+    async def _hash_images(self, images: List[str]) -> Dict[str, str]:
+        """
+        Perceptual hash of each distinct image as 16 hex digits, or "" when it cannot be read,
+        computed in the worker processes.
+        """
+        unique_images = list(dict.fromkeys(images))
+        loop = asyncio.get_running_loop()
+        hashes = await asyncio.gather(
+            *(loop.run_in_executor(self.image_pool, catalog_image_dhash, image) for image in unique_images)
+        )
+        return {image: "" if image_hash is None else f"{image_hash:016x}" for image, image_hash in zip(unique_images, hashes)}
+
+    def _load_catalog_images(self) -> None:
+        """
+        Read the perceptual hashes stored with the image entities, and their vectors, into the
+        index of the exact-catalog-image shortcut. Nothing is decoded or hashed here.
+        """
+        if self.image_hash_distance < 0:
+            return
+        hashes = self.image_db.stored_image_hashes()
+        stored = self.image_db.stored_vectors(list(hashes)) if hashes else {}
+        images = [image for image in hashes if image in stored]
+        self.catalog_images = (
+            images,
+            np.array([int(hashes[image], 16) for image in images], dtype=np.uint64),
+            [self._store_image_vector(None, stored[image]) for image in images],
+        )
+        logging.info(f"CATALOG RETRIEVER | Retriever._load_catalog_images() | Loaded {len(images)} catalog image hashes and vectors.")
+
+    def search_text_queries(
+        self,
+        queries: List[str],
+        k: int,
+        search_filter: CatalogFilter | None = None
+        ) -> List[List[Tuple[Any, float]]]:
+        """
+        Embed every query in one batch and answer them with a single multi-vector search.
+        Returns one (Document, relevance score) list per query, in query order.
+        """
+        vectors = self.embed_queries(queries)
+        return self.text_db.similarity_search_with_relevance_scores_by_vectors(vectors, k=k, search_filter=search_filter)
+
+    async def asearch_text_queries(
+        self,
+        queries: List[str],
+        k: int,
+        search_filter: CatalogFilter | None = None
+        ) -> List[List[Tuple[Any, float]]]:
+        """
+        Async counterpart of search_text_queries().
+        """
+        vectors = await self.aembed_queries(queries)
+        return await self._asearch_vectors(self.text_db, vectors, k, search_filter)
+
+    async def asearch_image(
+        self,
+        image: str | bytes,
+        k: int,
+        search_filter: CatalogFilter | None = None
+        ) -> List[Tuple[Any, float]]:
+        """
+        Embed a query image and search the image collection, without blocking the event loop.
+        """
+        vector = await self.aembed_image(image, verbose=True)
+        results = await self._asearch_vectors(self.image_db, [vector], k, search_filter)
+        return results[0]
+
     def text_embeddings(
         self,
         texts: List[str],
@@ -296,41 +739,16 @@ class Retriever:
         batch_size = 32
         num_batches = (len(texts) + batch_size - 1) // batch_size
 
+        # Preprocessing runs ahead in the worker pool; results stream back in input order.
+        prepared = self.image_pool.map(prepare_image_input, texts, repeat(verbose), chunksize=4)
+
         for i in range(0, len(texts), batch_size):
             batch_texts = texts[i:i + batch_size]
 
             if verbose:
                 logging.info(f"CATALOG RETRIEVER | Retriever.image_embeddings() | Processing image batch {i//batch_size + 1}/{num_batches} with {len(batch_texts)} images.")
             
-            input_data_list = []
-            
-            for text in batch_texts:
-                try:
-                    input_data = text
-                    if is_url(text):
-                        input_data = image_url_to_base64(text)
-                    elif is_path(text):
-                        input_data = image_path_to_base64(text)
-
-                    MAX_VARCHAR_LENGTH = 65535
-                    if len(input_data) > MAX_VARCHAR_LENGTH:
-                        if verbose:
-                            logging.info(f"CATALOG RETRIEVER | Image too large ({len(input_data)} bytes), resizing...")
-                        # Try to resize the image
-                        resized = resize_base64_image(input_data)
-                        if resized and len(resized) <= MAX_VARCHAR_LENGTH:
-                            input_data = resized
-                            if verbose:
-                                logging.info(f"CATALOG RETRIEVER | Image resized successfully to {len(input_data)} bytes")
-                        else:
-                            if verbose:
-                                logging.warning(f"CATALOG RETRIEVER | Failed to resize image or still too large after resize")
-                            input_data = None 
-                except Exception as e:
-                    if verbose:
-                        logging.error(f"CATALOG RETRIEVER | Error processing image for batching: {e}")
-                    input_data = None
-                input_data_list.append(input_data)
+            input_data_list = list(islice(prepared, len(batch_texts)))
 
             valid_inputs = [data for data in input_data_list if data is not None]
             
@@ -347,49 +765,170 @@ class Retriever:
 
             except Exception as e:
                 if verbose:
-                    error_msg = str(e)
-                    if "webp" in error_msg.lower():
-                        logging.error(f"CATALOG RETRIEVER | Unsupported image format detected (WebP). Only JPEG and PNG are supported: {e}")
-                    elif "format" in error_msg.lower() or "expected" in error_msg.lower():
-                        logging.error(f"CATALOG RETRIEVER | Image format error. Only JPEG and PNG are supported: {e}")
-                    else:
-                        logging.error(f"CATALOG RETRIEVER | Retriever.image_embeddings() | Error embedding image batch: {e}")
+                    self._log_image_embedding_error(e)
                 batch_embeddings = iter([])
 
-            # Reconstruct the batch with Nones for failed embeddings
-            reconstructed_batch = []
-            for data in input_data_list:
-                if data is not None:
-                    try:
-                        embedding = next(batch_embeddings)
-                        reconstructed_batch.append(embedding)
-                    except StopIteration:
-                        # If we run out of embeddings, add None for remaining items
-                        reconstructed_batch.append(None)
-                else:
-                    reconstructed_batch.append(None)
-            all_embeddings.extend(reconstructed_batch)
+            all_embeddings.extend(self._reconstruct_image_batch(input_data_list, batch_embeddings))
 
         return all_embeddings
 
+    @staticmethod
+    def _log_image_embedding_error(e: Exception) -> None:
+        """Log an image embedding failure, calling out unsupported formats."""
+        error_msg = str(e)
+        if "webp" in error_msg.lower():
+            logging.error(f"CATALOG RETRIEVER | Unsupported image format detected (WebP). Only JPEG and PNG are supported: {e}")
+        elif "format" in error_msg.lower() or "expected" in error_msg.lower():
+            logging.error(f"CATALOG RETRIEVER | Image format error. Only JPEG and PNG are supported: {e}")
+        else:
+            logging.error(f"CATALOG RETRIEVER | Retriever.image_embeddings() | Error embedding image batch: {e}")
 
+    @staticmethod
+    def _reconstruct_image_batch(
+        input_data_list: List[str | None],
+        batch_embeddings: Any
+    ) -> List[List[float] | None]:
+        """
+        Reconstruct the batch with Nones for failed embeddings
+        """
+        reconstructed_batch = []
+        for data in input_data_list:
+            if data is not None:
+                try:
+                    embedding = next(batch_embeddings)
+                    reconstructed_batch.append(embedding)
+                except StopIteration:
+                    # If we run out of embeddings, add None for remaining items
+                    reconstructed_batch.append(None)
+            else:
+                reconstructed_batch.append(None)
+        return reconstructed_batch
 
-    def milvus_from_csv(self, csv_path: str, verbose: bool = False) -> None:
+    async def _aembed_text_batch(
+        self,
+        client: AsyncOpenAI,
+        texts: List[str],
+        query_type: str = "passage",
+        verbose: bool = False
+    ) -> List[List[float] | None]:
         """
-        Fills the milvus database with the data from a CSV file.
-        Only populates if embeddings don't already exist.
-        """ 
+        Async counterpart of text_embeddings() for one ingestion batch of texts.
+        """
+        all_chunks, text_chunk_counts = self._create_text_chunks(texts)
+        all_chunk_embeddings = []
+        for i in range(0, len(all_chunks), self.ingest_batch_size):
+            batch_chunks = all_chunks[i:i + self.ingest_batch_size]
+            try:
+                response = await client.embeddings.create(
+                    input=batch_chunks,
+                    model=self.text_model_name,
+                    encoding_format="float",
+                    extra_body={"input_type": query_type, "truncate": "NONE"}
+                )
+                all_chunk_embeddings.extend([d.embedding for d in response.data])
+            except Exception as e:
+                if verbose:
+                    logging.error(f"CATALOG RETRIEVER | Retriever._aembed_text_batch() | Error embedding chunk batch: {e}")
+                all_chunk_embeddings.extend([None for _ in batch_chunks])
+        return self._reconstruct_embeddings(texts, all_chunk_embeddings, text_chunk_counts)
 
-        # Check if embeddings already exist
-        if self.embeddings_exist():
-            logging.info("CATALOG RETRIEVER | Retriever.milvus_from_csv() | Embeddings already exist, skipping population.")
+    async def _aembed_image_batch(
+        self,
+        client: AsyncOpenAI,
+        images: List[str],
+        verbose: bool = False
+    ) -> List[List[float] | None]:
+        """
+        Async counterpart of image_embeddings() for one ingestion batch of images.
+        """
+        # Decoding and resizing is CPU bound, so fan it out to the worker processes.
+        loop = asyncio.get_running_loop()
+        input_data_list = await asyncio.gather(
+            *(loop.run_in_executor(self.image_pool, prepare_image_input, image, verbose) for image in images)
+        )
+        valid_inputs = [data for data in input_data_list if data is not None]
+        try:
+            if valid_inputs:
+                response = await client.embeddings.create(
+                    input=valid_inputs,
+                    model=self.image_model_name,
+                    encoding_format="float",
+                )
+                batch_embeddings = iter([d.embedding for d in response.data])
+            else:
+                batch_embeddings = iter([])
+        except Exception as e:
+            if verbose:
+                self._log_image_embedding_error(e)
+            batch_embeddings = iter([])
+        return self._reconstruct_image_batch(input_data_list, batch_embeddings)
+
+
+
+    def _build_lexical_index(self) -> None:
+        """
+        Index the stored text entities for BM25 search. Documents carry their primary keys,
+        so lexical hits deduplicate and fuse with vector hits.
+        """
+        if not self.lexical_search:
             return
+        documents = self.text_db.all_documents()
+        # The vectors are read once here, so fusing never goes back to the vector store.
+        stored = self.text_db.stored_vectors([document.page_content for document in documents])
+        vectors = None
+        if all(document.page_content in stored for document in documents):
+            vectors = np.array([stored[document.page_content] for document in documents], dtype=np.float32)
+        self.lexical_index = BM25Index(documents, vectors=vectors)
+        logging.info(f"CATALOG RETRIEVER | Retriever._build_lexical_index() | Indexed {len(self.lexical_index)} documents.")
+
+    def bump_catalog_version(self) -> None:
+        """
+        Mark the catalog as changed, invalidating every cached retrieval result.
+        """
+        self.catalog_version += 1
+        self.result_cache.clear()
+        logging.info(f"CATALOG RETRIEVER | Retriever.bump_catalog_version() | Catalog version is now {self.catalog_version}.")
+
+    @staticmethod
+    def content_hash(row: Dict[str, Any]) -> str:
+        """
+        Stable hash of a catalog row (name, description, category, subcategory, price, image, ...).
+        Any change to the row changes the hash, so its entities get rebuilt on the next ingestion.
+        """
+        canonical = json.dumps(row, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def _typed_metadata(cls, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Coerce the filterable fields to fixed scalar types, so they are stored as typed
+        Milvus fields: category and subcategory as normalized strings, price as a float.
+        """
+        price = cls._coerce_float(row.get("price"))
+        return {
+            **row,
+            "category": str(row.get("category", "")).strip().lower(),
+            "subcategory": str(row.get("subcategory", "")).strip().lower(),
+            "price": price if price is not None else float("nan"),
+        }
 
-        logging.info(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | No embeddings found, populating from: '{csv_path}'")
+    def milvus_from_csv(self, csv_path: str, verbose: bool = False) -> None:
+        """
+        Synchronous entry point for amilvus_from_csv(), for callers without a running event loop.
+        """
+        asyncio.run(self.amilvus_from_csv(csv_path, verbose=verbose))
+
+    async def amilvus_from_csv(self, csv_path: str, verbose: bool = False) -> None:
+        """
+        Fills the vector database with the data from a CSV file.
+        In "incremental" mode only new or changed rows are embedded and rows that left the CSV
+        are deleted. In "full" mode the database is only populated if it is empty.
+        Text and image collections are ingested in parallel, each through a streaming pipeline.
+        """ 
 
         # Get our pd dataframe
         try:
-            df = pd.read_csv(csv_path)
+            df = await asyncio.to_thread(pd.read_csv, csv_path)
             logging.info(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | CSV read in.")
         except Exception as e:
             logging.debug(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | Error: {e} -- Failed to read CSV: {csv_path}.")            
@@ -398,164 +937,812 @@ class Retriever:
                 dir_contents.append(entry)
             logging.info(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | Directory contents at failure: {dir_contents}")
 
-        # Create combined name and description strings
-        metadatas = df.to_dict(orient="records")
+        # Create combined name and description strings, and tag each row with its content hash
+        metadatas = [
+            {**self._typed_metadata(row), CONTENT_HASH_FIELD: self.content_hash(row)}
+            for row in df.to_dict(orient="records")
+        ]
+        self._set_category_vocabulary(metadatas)
         combined_texts = [f"{name} | {desc} | {category},{subcategory}" for name, desc, category, subcategory in zip(df["name"].tolist(), df["description"].tolist(), df["category"].tolist(), df["subcategory"].tolist())]
-        
-        # Embed the combined name and description fields
-        text_embs = self.text_embeddings(combined_texts,query_type="passage",verbose=verbose)
 
-        # Filter out failed embeddings and their corresponding metadata
-        successful_texts_data = [
-            (text, emb, meta) for text, emb, meta in zip(combined_texts, text_embs, metadatas) if emb is not None
-        ]
-        if successful_texts_data:
-            successful_texts, successful_text_embs, successful_text_metadatas = zip(*successful_texts_data)
-            self.text_db.add_embeddings(
-                texts=list(successful_texts),
-                embeddings=list(successful_text_embs),
-                metadatas=list(successful_text_metadatas)
+        # Check if embeddings already exist
+        if self.ingestion_mode == "full" and await asyncio.to_thread(self.embeddings_exist):
+            logging.info("CATALOG RETRIEVER | Retriever.milvus_from_csv() | Embeddings already exist, skipping population.")
+            await asyncio.gather(
+                asyncio.to_thread(self._build_lexical_index),
+                asyncio.to_thread(self._load_catalog_images),
             )
+            return
 
-        logging.info(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | Text embeddings obtained.")   
+        logging.info(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | Syncing embeddings ({self.ingestion_mode}) from: '{csv_path}'")
 
-        # Embed the image field of each row
-        image_embs = self.image_embeddings(df["image"].tolist(), verbose=verbose)
+        # Ingestion gets its own clients: it may run on a different event loop than the query path.
+        text_client = AsyncOpenAI(api_key=self.embed_key, base_url=self.text_embed_port)
+        image_client = AsyncOpenAI(api_key=self.embed_key, base_url=self.image_embed_port)
+        try:
+            await asyncio.gather(
+                self._sync_collection(
+                    self.text_db,
+                    combined_texts,
+                    metadatas,
+                    lambda texts: self._aembed_text_batch(text_client, texts, query_type="passage", verbose=verbose),
+                    "text"
+                ),
+                self._sync_collection(
+                    self.image_db,
+                    df["image"].tolist(),
+                    metadatas,
+                    lambda images: self._aembed_image_batch(image_client, images, verbose=verbose),
+                    "image",
+                    hash_images=True
+                ),
+            )
+        finally:
+            await text_client.close()
+            await image_client.close()
+        await asyncio.gather(
+            asyncio.to_thread(self._build_lexical_index),
+            asyncio.to_thread(self._load_catalog_images),
+        )
+        self.bump_catalog_version()
+        logging.info(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | Text and image embeddings obtained.") 
+
+    def _set_category_vocabulary(self, metadatas: List[Dict[str, Any]]) -> None:
+        """Collect the normalized category and subcategory values of the catalog rows and their categories."""
+        partition_map: Dict[str, Set[str]] = {}
+        for metadata in metadatas:
+            for value in (metadata["category"], metadata["subcategory"]):
+                if value:
+                    partition_map.setdefault(value, set()).add(metadata["category"])
+        self.category_partition_map = partition_map
+        self.category_vocabulary = set(partition_map)
+
+    def export_snapshot(self, root: str, csv_path: str | None = None) -> str:
+        """
+        Write the ingested catalog as a versioned snapshot under root (see snapshot.py).
+        Needs the "numpy" vector store, which holds the vectors in process.
+        Returns the snapshot directory.
+        """
+        if not isinstance(self.text_db, NumpyVectorStore) or not isinstance(self.image_db, NumpyVectorStore):
+            raise ValueError("Catalog snapshots are built with vector_store 'numpy'")
+        return write_snapshot(
+            root,
+            {"text": self.text_db.export(), "image": self.image_db.export()},
+            self.catalog_images[:2],
+            text_model=self.text_model_name,
+            image_model=self.image_model_name,
+            csv_path=csv_path,
+        )
 
-        # Log the number of total and failed image embeddings
-        total_images = len(df["image"].tolist())
-        failed_image_embeddings = total_images - len([e for e in image_embs if e is not None])
-        logging.info(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | Total images: {total_images}, Failed embeddings: {failed_image_embeddings}")
+    async def aload_snapshot(self, path: str, csv_path: str | None = None, verbose: bool = False) -> None:
+        """
+        Fill the vector stores from a catalog snapshot instead of embedding the CSV.
+        The numpy store memory-maps the snapshot vectors; Milvus gets the missing rows through
+        the ingestion pipeline's batched inserts, with the snapshot standing in for the NIMs.
+        If csv_path has changed since the snapshot was built, an incremental ingestion follows,
+        which embeds only the new or changed rows.
+        """
+        start = time.monotonic()
+        snapshot = await asyncio.to_thread(CatalogSnapshot, path)
+        manifest = snapshot.manifest
+        if (manifest["text_model"], manifest["image_model"]) != (self.text_model_name, self.image_model_name):
+            raise ValueError(
+                f"Catalog snapshot {snapshot.version} was embedded with {manifest['text_model']} and "
+                f"{manifest['image_model']}, not {self.text_model_name} and {self.image_model_name}"
+            )
+
+        for label, db in (("text", self.text_db), ("image", self.image_db)):
+            texts, metadatas, vectors = snapshot.collections[label]
+            if label == "image":
+                metadatas = self._with_image_hashes(texts, metadatas, snapshot.catalog_images)
+            if isinstance(db, NumpyVectorStore):
+                db.load_arrays(texts, metadatas, vectors)
+                continue
+            lookup = dict(zip(texts, vectors))
+
+            async def snapshot_vectors(batch: List[str], lookup: Dict[str, np.ndarray] = lookup) -> List[List[float]]:
+                return [lookup[text].tolist() for text in batch]
 
-        # Filter out failed embeddings and their corresponding metadata
-        successful_images_data = [
-            (img_ref, emb, meta) for img_ref, emb, meta in zip(df["image"].tolist(), image_embs, metadatas) if emb is not None
+            await self._sync_collection(db, texts, metadatas, snapshot_vectors, label, hash_images=label == "image")
+        self._set_category_vocabulary(snapshot.collections["text"][1])
+        logging.info(f"CATALOG RETRIEVER | Retriever.aload_snapshot() | Loaded snapshot {snapshot.version} from {snapshot.path} in {time.monotonic() - start:.2f}s.")
+
+        if csv_path and manifest.get("csv_sha256") and await asyncio.to_thread(file_sha256, csv_path) != manifest["csv_sha256"]:
+            logging.info(f"CATALOG RETRIEVER | Retriever.aload_snapshot() | {csv_path} changed since the snapshot was built, syncing the difference.")
+            await self.amilvus_from_csv(csv_path, verbose=verbose)
+            return
+        await asyncio.gather(
+            asyncio.to_thread(self._build_lexical_index),
+            asyncio.to_thread(self._load_catalog_images),
+        )
+        self.bump_catalog_version()
+
+    @staticmethod
+    def _with_image_hashes(
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        catalog_images: Tuple[List[str], np.ndarray]
+    ) -> List[Dict[str, Any]]:
+        """
+        Image entity metadata carrying the image hashes of a snapshot written before they were
+        stored with each entity, so loading it hashes nothing.
+        """
+        if all(IMAGE_HASH_FIELD in metadata for metadata in metadatas):
+            return metadatas
+        hashes = {image: f"{int(image_hash):016x}" for image, image_hash in zip(*catalog_images)}
+        return [
+            metadata if IMAGE_HASH_FIELD in metadata else {**metadata, IMAGE_HASH_FIELD: hashes.get(text, "")}
+            for text, metadata in zip(texts, metadatas)
         ]
-        if successful_images_data:
-            successful_images, successful_image_embs, successful_image_metadatas = zip(*successful_images_data)
-            self.image_db.add_embeddings(
-                texts=list(successful_images),
-                embeddings=list(successful_image_embs),
-                metadatas=list(successful_image_metadatas)
+
+    async def _sync_collection(
+        self,
+        db: Any,
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+        embed_fn: Any,
+        label: str,
+        hash_images: bool = False
+    ) -> None:
+        """
+        Bring one collection in line with the catalog rows.
+        Rows whose content hash is already stored are skipped, new or changed rows are inserted
+        and stored rows whose hash left the catalog are deleted. Vectors of unchanged text or
+        images (e.g. a price-only change) are reused instead of re-embedded.
+        With hash_images, inserted rows that do not carry an image hash yet take the stored hash
+        of the same image, or are hashed first; no other image is decoded.
+
+        New rows stream through a bounded pipeline: embedding batches run up to
+        ingest_concurrency at a time and an inserter writes them in ingest_insert_batch_size groups.
+        """
+        stored = await asyncio.to_thread(db.stored_hashes)
+        carried: Dict[str, Any] = {}
+        if stored is None:
+            logging.info(f"CATALOG RETRIEVER | Retriever._sync_collection() | {label} collection has no content hashes, rebuilding it.")
+            await asyncio.to_thread(db.drop)
+            stored = set()
+        else:
+            # Collections from before category partitioning or stored image hashes are recreated
+            # with the current schema. Their vectors are carried over, so the rebuild needs no embedding calls.
+            rebuild = None
+            if self.category_partitions and not await asyncio.to_thread(db.is_partitioned):
+                rebuild = f"is not partitioned by {PARTITION_FIELD}"
+            elif hash_images and not await asyncio.to_thread(db.has_field, IMAGE_HASH_FIELD):
+                rebuild = "has no image hashes"
+            if rebuild:
+                logging.info(f"CATALOG RETRIEVER | Retriever._sync_collection() | {label} collection {rebuild}, rebuilding it.")
+                carried = await asyncio.to_thread(db.stored_vectors, texts)
+                await asyncio.to_thread(db.drop)
+                stored = set()
+
+        rows: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        for text, metadata in zip(texts, metadatas):
+            rows.setdefault(metadata[CONTENT_HASH_FIELD], (text, metadata))
+        new_rows = [row for content_hash, row in rows.items() if content_hash not in stored]
+        removed = [content_hash for content_hash in stored if content_hash not in rows]
+
+        logging.info(f"CATALOG RETRIEVER | Retriever._sync_collection() | {label}: {len(rows)} rows, {len(new_rows)} new or changed, {len(removed)} removed.")
+
+        if new_rows and hash_images:
+            unhashed = [text for text, metadata in new_rows if IMAGE_HASH_FIELD not in metadata]
+            if unhashed:
+                # Changed rows whose image is already stored (e.g. a price change) keep its hash.
+                hashes = await asyncio.to_thread(db.stored_image_hashes)
+                missing = [text for text in unhashed if text not in hashes]
+                if missing:
+                    hashes.update(await self._hash_images(missing))
+                new_rows = [
+                    (text, metadata if IMAGE_HASH_FIELD in metadata else {**metadata, IMAGE_HASH_FIELD: hashes[text]})
+                    for text, metadata in new_rows
+                ]
+
+        if new_rows:
+            reused = carried or await asyncio.to_thread(db.stored_vectors, [text for text, _ in new_rows])
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.ingest_queue_size)
+            producer = asyncio.create_task(self._produce_embeddings(new_rows, reused, embed_fn, queue))
+            consumer = asyncio.create_task(self._insert_embeddings(db, queue))
+            try:
+                embedded, inserted = await asyncio.gather(producer, consumer)
+            finally:
+                # If either side fails, make sure the other one does not wait forever.
+                producer.cancel()
+                consumer.cancel()
+            logging.info(f"CATALOG RETRIEVER | Retriever._sync_collection() | {label}: embedded {embedded}, reused {len(new_rows) - embedded}, failed {len(new_rows) - inserted}.")
+
+        # Delete after inserting, so searches never see a partially emptied catalog.
+        if removed:
+            await asyncio.to_thread(db.delete_by_hashes, removed)
+        # The numpy store is written to disk once per sync, not once per inserted batch.
+        if isinstance(db, NumpyVectorStore) and (new_rows or removed):
+            await asyncio.to_thread(db.persist)
+
+    async def _produce_embeddings(
+        self,
+        rows: List[Tuple[str, Dict[str, Any]]],
+        reused: Dict[str, Any],
+        embed_fn: Any,
+        queue: asyncio.Queue
+    ) -> int:
+        """
+        Feed (text, embedding, metadata) batches into the queue, ending with a None sentinel.
+        Rows with a reusable vector go straight through; the rest are embedded in batches with at
+        most ingest_concurrency requests in flight. Returns the number of rows sent for embedding.
+        """
+        limit = asyncio.Semaphore(self.ingest_concurrency)
+        tasks = []
+
+        async def embed_batch(batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+            try:
+                embeddings = await embed_fn([text for text, _ in batch])
+                await queue.put([(text, emb, metadata) for (text, metadata), emb in zip(batch, embeddings)])
+            finally:
+                limit.release()
+
+        try:
+            ready = [(text, reused[text], metadata) for text, metadata in rows if text in reused]
+            if ready:
+                await queue.put(ready)
+
+            to_embed = [(text, metadata) for text, metadata in rows if text not in reused]
+            for i in range(0, len(to_embed), self.ingest_batch_size):
+                # Backpressure: wait for a free slot before starting the next batch.
+                await limit.acquire()
+                tasks.append(asyncio.create_task(embed_batch(to_embed[i:i + self.ingest_batch_size])))
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+        await queue.put(None)
+        return len(to_embed)
+
+    async def _insert_embeddings(self, db: Any, queue: asyncio.Queue) -> int:
+        """
+        Drain embedded batches from the queue and insert them in groups.
+        Failed embeddings are dropped. Returns the number of inserted rows.
+        """
+        pending: List[Tuple[str, Any, Dict[str, Any]]] = []
+        inserted = 0
+
+        async def flush() -> None:
+            texts, embeddings, metadatas = zip(*pending)
+            await asyncio.to_thread(
+                db.add_embeddings,
+                texts=list(texts),
+                embeddings=list(embeddings),
+                metadatas=list(metadatas)
             )
+            pending.clear()
+
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                break
+            # Filter out failed embeddings and their corresponding metadata
+            successful = [item for item in batch if item[1] is not None]
+            pending.extend(successful)
+            inserted += len(successful)
+            if len(pending) >= self.ingest_insert_batch_size:
+                await flush()
+        if pending:
+            await flush()
+        return inserted
+
+    async def warm_up(self, queries: List[str], k: int = 4) -> None:
+        """
+        Make the first real requests as fast as the rest: load both collections into memory,
+        open the connections to the text embedding NIM and the vector store, and fill the
+        embedding cache, by running the warm-up queries through the search path.
+        Results are discarded and never enter the result cache.
+        """
+        start = time.monotonic()
+        await asyncio.gather(
+            asyncio.to_thread(self.text_db.load_into_memory),
+            asyncio.to_thread(self.image_db.load_into_memory),
+        )
+        logging.info(f"CATALOG RETRIEVER | Retriever.warm_up() | Collections loaded in {time.monotonic() - start:.2f}s.")
+        if not queries:
+            return
 
-        logging.info(f"CATALOG RETRIEVER | Retriever.milvus_from_csv() | Image embeddings obtained.") 
+        vectors = await self.aembed_queries(queries)
+        await self._asearch_vectors(self.text_db, vectors, k, None)
+        if self.lexical_index is not None:
+            for query in queries:
+                self.lexical_index.search(query, k)
+        # Image searches use a stored catalog vector, so warming up never calls the image NIM.
+        if self.catalog_images[2]:
+            await self._asearch_vectors(self.image_db, self.catalog_images[2][:1], k, None)
+        logging.info(f"CATALOG RETRIEVER | Retriever.warm_up() | Ran {len(queries)} warm-up queries, {time.monotonic() - start:.2f}s in total.")
 
     async def retrieve(
         self,
         query: List[str],
         categories: List[str],
         filters: Dict[str, Any] | None = None,
-        image: str = "",
+        image: str | bytes = "",
         k: int = 4,
         image_bool: bool = False,
-        verbose: bool = True
+        verbose: bool = True,
+        stats: Dict[str, Any] | None = None
     ) -> Tuple[List[str], List[str], List[float], List[str], List[str]]:
         """
         Asynchronously retrieve relevant items from both text and image databases.
+        The image may be a base64 string or the raw uploaded bytes.
+        If fewer than k results survive the threshold and filters, the search is repeated with a
+        geometrically larger limit, up to max_fetch_limit. When a `stats` dict is passed it is filled
+        with the number of search rounds and the final fetch limit, or with cached=True on a cache hit.
+        Repeated requests are answered from the result cache, skipping embedding and search, and
+        identical requests arriving while one is still running wait for it (stats["coalesced"]).
         """
+        cache_key = retrieval_cache_key(self.catalog_version, query, categories, filters, k, image_bool, image)
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            if verbose:
+                logging.info("CATALOG RETRIEVER | retrieve() | Result cache hit.")
+            if stats is not None:
+                stats["cached"] = True
+            return tuple(list(values) for values in cached)
+
+        compute = lambda: self._retrieve_uncached(cache_key, query, categories, filters, image, k, image_bool, verbose)
+        if not self.coalesce_requests:
+            results, computed_stats = await compute()
+            if stats is not None:
+                stats.update(computed_stats)
+            return results
 
-        # Check if our query is blank. If it is, replace it with dummy text.
-        local_queries = query
-        if not query:
-            local_queries = ["Can you find me something like this image?"]
-
+        (results, computed_stats), shared = await self.in_flight.do(cache_key, compute)
+        if stats is not None:
+            stats.update(computed_stats)
+            if shared:
+                stats["coalesced"] = True
+        if shared and verbose:
+            logging.info("CATALOG RETRIEVER | retrieve() | Coalesced onto an identical in-flight request.")
+        # Every caller gets its own lists.
+        return tuple(list(values) for values in results)
+
+    async def _retrieve_uncached(
+        self,
+        cache_key: Tuple[Any, ...],
+        query: List[str],
+        categories: List[str],
+        filters: Dict[str, Any] | None,
+        image: str | bytes,
+        k: int,
+        image_bool: bool,
+        verbose: bool
+    ) -> Tuple[Tuple[List[str], List[str], List[float], List[str], List[str]], Dict[str, Any]]:
+        """
+        Plan, embed and search one request, then cache the result. Returns (results, stats).
+        """
+        stats: Dict[str, Any] = {}
+        plan = self._plan_retrieval(query, categories, filters, image, k, image_bool, verbose)
+        if plan is None:
+            return ([], [], [], [], []), stats
+        shortcut = self._lexical_shortcut(plan, verbose)
+        if shortcut is not None:
+            self._record_retrieval(cache_key, plan, shortcut, stats)
+            return shortcut, stats
+
+        # Queries are embedded once. Deeper rounds only repeat the vector search.
+        image_vector = None
         if image_bool:
             if verbose:
                 logging.info("CATALOG RETRIEVER | retrieve() | Performing dual retrieval for image input.")
-
-            # Use asyncio.gather for concurrency
-            t2t_tasks = []
-            for local_query in local_queries:
-                if verbose:
-                    logging.info(f"\t| retrieve() | Checking query: {local_query}.")
-                t2t_tasks.append(asyncio.to_thread(self.text_db.similarity_search_with_relevance_scores, local_query, k=k))
-            if verbose:
-                logging.info("CATALOG RETRIEVER | retrieve() | Started text task.")
-            base64_string = image.replace("data:application/octet-stream", "data:image/jpeg")
-            if verbose:
-                logging.info(f"CATALOG RETRIEVER | retrieve() | Starting image task...\n\t| {base64_string[:100]}")
+                logging.info(f"\t| retrieve() | Checking queries: {plan.queries}.")
+                preview = plan.image[:100] if isinstance(plan.image, str) else f"<{len(plan.image)} bytes>"
+                logging.info(f"CATALOG RETRIEVER | retrieve() | Starting image task...\n\t| {preview}")
+            # Use asyncio.gather for concurrency. All text queries share one batched embedding call.
+            text_vectors, image_vector = await asyncio.gather(
+                self.aembed_queries(plan.queries),
+                self.aembed_image(plan.image, verbose=True)
+            )
             if verbose:
                 logging.info(f"CATALOG RETRIEVER | retrieve() | Obtained embedding...")
-            i2i_task = asyncio.to_thread(self.image_db.similarity_search_with_relevance_scores, base64_string, k=k*len(query))
-
-            unformatted_results = await asyncio.gather(*t2t_tasks, i2i_task)
         else:
             if verbose:
-                logging.info(f"CATALOG RETRIEVER | retrieve() | Text-only retrieval. Queries: {local_queries}")
+                logging.info(f"CATALOG RETRIEVER | retrieve() | Text-only retrieval. Queries: {plan.queries}")
+            text_vectors = await self.aembed_queries(plan.queries)
 
-            results  = []
-            for local_query in local_queries:
-                if verbose:
-                    logging.info(f"\t| retrieve() | Launching text-only retrieval. Query type: {type(local_query)}, Query: {local_query}")
-                results.append(asyncio.to_thread(self.text_db.similarity_search_with_relevance_scores, local_query, k=k*len(query)))
-            unformatted_results = await asyncio.gather(*results)
+        results = await self._search_rounds(plan, text_vectors, image_vector, verbose)
+        self._record_retrieval(cache_key, plan, results, stats)
+        return results, stats
 
-        sorted_unformatted_results = []
-        for query_results in unformatted_results:
-            # Sort each list of (Document, score) tuples by the score in descending order
-            sorted_query_results = sorted(query_results, key=lambda item: item[1], reverse=True)
-            sorted_unformatted_results.append(sorted_query_results)
+    async def retrieve_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        verbose: bool = False
+    ) -> List[Tuple[Tuple[List[str], List[str], List[float], List[str], List[str]], Dict[str, Any]]]:
+        """
+        Answer many retrieval requests together. Each request takes the keyword arguments of
+        retrieve() (query, categories, filters, image, k, image_bool).
+        All text queries share batched embedding calls, all images share batched image calls, and
+        requests with the same filter share one multi-vector search. Requests that need deeper
+        rounds continue on their own. Requests repeated in the batch are searched once, and requests
+        identical to an in-flight retrieve() wait for it; both get stats["coalesced"].
+        Returns (results, stats) per request, in request order.
+        """
+        outputs: List[Any] = [None] * len(requests)
+        all_stats: List[Dict[str, Any]] = [{} for _ in requests]
+        pending = []
+        # Requests repeated within the batch, or already running as single requests, are not searched again.
+        first_index: Dict[Any, int] = {}
+        duplicates: List[Tuple[int, int]] = []
+        joined: List[Tuple[int, asyncio.Task]] = []
+        for index, request in enumerate(requests):
+            query = request.get("query", [])
+            categories = request.get("categories", [])
+            filters = request.get("filters")
+            image = request.get("image", "")
+            k = request.get("k", 4)
+            image_bool = request.get("image_bool", False)
+            cache_key = retrieval_cache_key(self.catalog_version, query, categories, filters, k, image_bool, image)
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                outputs[index] = tuple(list(values) for values in cached)
+                all_stats[index]["cached"] = True
+                continue
+            if cache_key in first_index:
+                duplicates.append((index, first_index[cache_key]))
+                continue
+            first_index[cache_key] = index
+            running = self.in_flight.join(cache_key) if self.coalesce_requests else None
+            if running is not None:
+                joined.append((index, running))
+                continue
+            plan = self._plan_retrieval(query, categories, filters, image, k, image_bool, verbose)
+            if plan is None:
+                outputs[index] = ([], [], [], [], [])
+                continue
+            shortcut = self._lexical_shortcut(plan, verbose)
+            if shortcut is not None:
+                outputs[index] = shortcut
+                self._record_retrieval(cache_key, plan, shortcut, all_stats[index])
+                continue
+            pending.append((index, cache_key, plan))
 
-        if verbose:
-            logging.info(f"""CATALOG RETRIEVER | retrieve() | Pre-interleaving data
-                            \n\t| Similarities: {[res[1] for sublist in sorted_unformatted_results for res in sublist]}
-                            \n\t| Names: {[res[0].metadata['name'] for sublist in sorted_unformatted_results for res in sublist]}""")
+        if pending:
+            image_plans = [plan for _, _, plan in pending if plan.image_bool]
+            text_vectors, image_vectors = await asyncio.gather(
+                self.aembed_queries([query for _, _, plan in pending for query in plan.queries]),
+                self.aembed_images([plan.image for plan in image_plans], verbose=verbose)
+            )
+            vectors_by_plan = {}
+            offset = 0
+            for _, _, plan in pending:
+                vectors_by_plan[id(plan)] = [text_vectors[offset:offset + len(plan.queries)], None]
+                offset += len(plan.queries)
+            for plan, vector in zip(image_plans, image_vectors):
+                vectors_by_plan[id(plan)][1] = vector
+
+            searchable = []
+            for index, cache_key, plan in pending:
+                if plan.image_bool and vectors_by_plan[id(plan)][1] is None:
+                    outputs[index] = ([], [], [], [], [])
+                    all_stats[index]["error"] = "Failed to generate image embedding"
+                else:
+                    searchable.append((index, cache_key, plan))
+
+            first_rounds = await self._batched_first_round([plan for _, _, plan in searchable], vectors_by_plan)
+            results = await asyncio.gather(*(
+                self._search_rounds(plan, *vectors_by_plan[id(plan)], verbose, first_round=first_round)
+                for (_, _, plan), first_round in zip(searchable, first_rounds)
+            ))
+            for (index, cache_key, plan), result in zip(searchable, results):
+                outputs[index] = result
+                self._record_retrieval(cache_key, plan, result, all_stats[index])
+
+        joined_results = await asyncio.gather(*(asyncio.shield(task) for _, task in joined), return_exceptions=True)
+        for (index, _), joined_result in zip(joined, joined_results):
+            if isinstance(joined_result, Exception):
+                outputs[index] = ([], [], [], [], [])
+                all_stats[index].update(error=str(joined_result), coalesced=True)
+                continue
+            outputs[index], computed_stats = joined_result
+            all_stats[index].update(computed_stats, coalesced=True)
 
-        # For image search, combine all results and sort by similarity instead of interleaving
-        if image_bool:
-            # Combine all results from different sources
-            all_unformatted_results = []
-            for sublist in sorted_unformatted_results:
-                all_unformatted_results.extend(sublist)
-            # Sort combined results by similarity score
-            interleaved_results = sorted(all_unformatted_results, key=lambda item: item[1], reverse=True)
-        else:
-            # For text-only search, use interleaving as before
-            interleaved_results = []
-            # Store them in a regular list
-            active_iterators = [iter(lst) for lst in sorted_unformatted_results] 
-            while active_iterators:
-                current_it = active_iterators.pop(0)
-                try:
-                    item = next(current_it)
-                    interleaved_results.append(item)
-                    active_iterators.append(current_it)
-                except StopIteration:
-                    pass
-                
-        # Deduplicate.
-        seen_ids = set()
-        final_results = [] 
-        for res in interleaved_results:
-            pk_value = res[0].metadata.get("pk") 
-            id_ = str(pk_value) if pk_value is not None else None 
-            if id_ is not None and id_ not in seen_ids:
-                seen_ids.add(id_)
-                final_results.append(res)
-        
-        all_results = final_results
+        for index, first in duplicates:
+            outputs[index] = outputs[first]
+            all_stats[index] = {**all_stats[first], "coalesced": True}
+        self.in_flight.coalesced += len(duplicates)
+        # Duplicates must not share lists with their first occurrence.
+        outputs = [tuple(list(values) for values in output) for output in outputs]
 
         if verbose:
-            logging.info(f"""CATALOG RETRIEVER | retrieve() | All retrieved results length. {len(all_results)}
-                            \n\t| Similarities: {[res[1] for res in all_results]}
-                            \n\t| Names: {[res[0].metadata['name'] for res in all_results]}""")
-
-        # Keep the highest-ranked top-k first, then apply explicit filters to that window.
-        ranked_results = all_results[:k]
-        ranked_results = [res for res in ranked_results if res[1] > self.sim_threshold]
-        ranked_results = sorted(ranked_results, key=lambda item: item[1], reverse=True)
-        ranked_results = self._apply_structured_filters(
-            ranked_results,
+            logging.info(f"CATALOG RETRIEVER | retrieve_batch() | Answered {len(requests)} requests, {len(pending)} searched.")
+        return list(zip(outputs, all_stats))
+
+    async def _batched_first_round(
+        self,
+        plans: List[RetrievalPlan],
+        vectors_by_plan: Dict[int, List[Any]]
+    ) -> List[List[List[Tuple[Any, float]]]]:
+        """
+        Run the first search round of many plans, with one multi-vector search per
+        (collection, filter) group at the largest limit in the group.
+        Each plan gets its hit lists truncated back to its own limits, exactly as if searched alone.
+        """
+        groups: Dict[Tuple[str, str], List[Tuple[int, List[Any], int]]] = {}
+        for position, plan in enumerate(plans):
+            text_vectors, image_vector = vectors_by_plan[id(plan)]
+            text_key = ("text", plan.text_filter.to_expr() if plan.text_filter else "")
+            groups.setdefault(text_key, []).extend((position, vector, plan.text_limit) for vector in text_vectors)
+            if plan.image_bool:
+                image_key = ("image", plan.image_filter.to_expr() if plan.image_filter else "")
+                groups.setdefault(image_key, []).append((position, image_vector, plan.image_limit))
+
+        async def search(key: Tuple[str, str], members: List[Tuple[int, List[Any], int]]):
+            db = self.text_db if key[0] == "text" else self.image_db
+            plan = plans[members[0][0]]
+            search_filter = plan.text_filter if key[0] == "text" else plan.image_filter
+            return await self._asearch_vectors(
+                db, [vector for _, vector, _ in members], max(limit for _, _, limit in members), search_filter
+            )
+
+        # Text groups come first, so each plan collects its text lists before its image list.
+        keys = sorted(groups, key=lambda key: key[0] != "text")
+        grouped_hits = await asyncio.gather(*(search(key, groups[key]) for key in keys))
+        first_rounds: List[List[List[Tuple[Any, float]]]] = [[] for _ in plans]
+        for key, hits_per_vector in zip(keys, grouped_hits):
+            for (position, _, limit), hits in zip(groups[key], hits_per_vector):
+                first_rounds[position].append(hits[:limit])
+        return first_rounds
+
+    def _plan_retrieval(
+        self,
+        query: List[str],
+        categories: List[str],
+        filters: Dict[str, Any] | None,
+        image: str | bytes,
+        k: int,
+        image_bool: bool,
+        verbose: bool
+    ) -> RetrievalPlan | None:
+        """
+        Resolve a request into its search inputs. Returns None when the answer is known to be empty.
+        """
+        # Check if our query is blank. If it is, replace it with dummy text.
+        local_queries = query
+        if not query:
+            local_queries = ["Can you find me something like this image?"]
+
+        # Category and price constraints are evaluated inside the vector search, so the
+        # top-k window is filled with matching products instead of being thinned afterwards.
+        # Image searches are not restricted by category.
+        price_filter = self._build_search_filter(None, filters)
+        text_filter = price_filter
+        if not image_bool:
+            if not categories:
+                if verbose:
+                    logging.info("CATALOG RETRIEVER | No categories provided for text search, returning empty.")
+                return None
+            text_filter = self._build_search_filter(categories, filters)
+            if text_filter is not None and text_filter.categories == []:
+                if verbose:
+                    logging.info(f"CATALOG RETRIEVER | retrieve() | No catalog category matches {categories}, returning empty.")
+                return None
+
+        plan = RetrievalPlan(
+            queries=local_queries,
+            categories=categories,
             filters=filters,
-            verbose=verbose
+            k=k,
+            image_bool=image_bool,
+            image=self._normalize_image(image) if image_bool else "",
+            text_filter=text_filter,
+            image_filter=price_filter,
+        )
+        if self.lexical_index is not None and not image_bool:
+            self._search_lexical(plan)
+            plan.exact_hits = [self.lexical_index.exact_name(q, text_filter) for q in local_queries]
+        return plan
+
+    def _search_lexical(self, plan: RetrievalPlan) -> None:
+        """BM25 hits of every query, as deep as the vector search of the current round."""
+        plan.lexical_hits = [self.lexical_index.search(q, plan.text_limit, plan.text_filter) for q in plan.queries]
+
+    def _lexical_shortcut(
+        self,
+        plan: RetrievalPlan,
+        verbose: bool
+    ) -> Tuple[List[str], List[str], List[float], List[str], List[str]] | None:
+        """
+        Answer without embedding when every query names a product exactly and those products
+        fill all k slots, e.g. cart lookups by item name. Exact hits get similarity 1.0.
+        """
+        if not plan.exact_hits or any(document is None for document in plan.exact_hits):
+            return None
+        if len({document.metadata.get("pk") for document in plan.exact_hits}) < plan.k:
+            return None
+        self.lexical_shortcuts += 1
+        if verbose:
+            logging.info(f"CATALOG RETRIEVER | retrieve() | Exact product name match for {plan.queries}, skipping embedding.")
+        return self._rank_results(
+            [[(document, 1.0)] for document in plan.exact_hits],
+            plan.categories, plan.filters, plan.k, plan.image_bool, verbose
+        )
+
+    def _lexical_candidates(
+        self,
+        plan: RetrievalPlan,
+        text_vectors: List[Any]
+    ) -> List[List[Tuple[Any, float]]]:
+        """
+        Give each query's BM25 hits their cosine relevance to the query vector, from the
+        vectors held by the lexical index, so fused results report comparable similarities.
+        """
+        candidates = []
+        for hits, query_vector in zip(plan.lexical_hits, text_vectors):
+            documents = [document for document, _ in hits]
+            cosines = self.lexical_index.cosine_similarities(documents, query_vector)
+            # Same mapping as the COSINE relevance score of both vector stores.
+            candidates.append([(document, (cosine + 1) / 2.0) for document, cosine in zip(documents, cosines) if cosine is not None])
+        return candidates
+
+    @staticmethod
+    def _normalize_image(image: str | bytes) -> str | bytes:
+        """Fix the MIME type of base64 uploads. Raw bytes are passed through untouched."""
+        if isinstance(image, str):
+            return image.replace("data:application/octet-stream", "data:image/jpeg")
+        return image
+
+    async def _search_rounds(
+        self,
+        plan: RetrievalPlan,
+        text_vectors: List[Any],
+        image_vector: List[float] | None,
+        verbose: bool,
+        first_round: List[List[Tuple[Any, float]]] | None = None
+    ) -> Tuple[List[str], List[str], List[float], List[str], List[str]]:
+        """
+        Search and rank, deepening the search while too few results survive.
+        A first round that was already searched, e.g. as part of a batch, can be passed in.
+        BM25 hits are fused into each query's vector hits by reciprocal rank fusion, and are
+        searched again at the deeper limit whenever a round deepens the vector search.
+        """
+        lexical_candidates = None
+        lexical_limit = plan.text_limit
+        if plan.lexical_hits and any(plan.lexical_hits):
+            lexical_candidates = self._lexical_candidates(plan, text_vectors)
+        while True:
+            plan.rounds += 1
+            # A list shorter than the limit it was searched with already holds every BM25 match.
+            if lexical_candidates is not None and plan.text_limit > lexical_limit \
+                    and any(len(hits) >= lexical_limit for hits in plan.lexical_hits):
+                self._search_lexical(plan)
+                lexical_candidates = self._lexical_candidates(plan, text_vectors)
+            lexical_limit = plan.text_limit
+            if first_round is not None:
+                unformatted_results, first_round = first_round, None
+            else:
+                # One multi-vector search for every entity, plus the image search when given.
+                searches = [self._asearch_vectors(self.text_db, text_vectors, plan.text_limit, plan.text_filter)]
+                if plan.image_bool:
+                    searches.append(self._asearch_vectors(self.image_db, [image_vector], plan.image_limit, plan.image_filter))
+                unformatted_results = [hits for result in await asyncio.gather(*searches) for hits in result]
+            limits = [plan.text_limit] * len(text_vectors) + ([plan.image_limit] if plan.image_bool else [])
+
+            ranked_lists = unformatted_results
+            if lexical_candidates is not None:
+                ranked_lists = [
+                    reciprocal_rank_fusion([hits, lexical_hits], k=self.rrf_k)
+                    for hits, lexical_hits in zip(unformatted_results, lexical_candidates)
+                ]
+
+            results = self._rank_results(ranked_lists, plan.categories, plan.filters, plan.k, plan.image_bool, verbose)
+            if len(results[0]) >= plan.k or not self._can_deepen(unformatted_results, limits):
+                return results
+            plan.text_limit = min(int(plan.text_limit * self.fetch_growth) + 1, self.max_fetch_limit)
+            plan.image_limit = min(int(plan.image_limit * self.fetch_growth) + 1, self.max_fetch_limit)
+            if verbose:
+                logging.info(
+                    f"CATALOG RETRIEVER | retrieve() | {len(results[0])}/{plan.k} results after round {plan.rounds}, "
+                    f"deepening search to limits text={plan.text_limit} image={plan.image_limit}"
+                )
+
+    def _record_retrieval(
+        self,
+        cache_key: Any,
+        plan: RetrievalPlan,
+        results: Tuple[List[str], List[str], List[float], List[str], List[str]],
+        stats: Dict[str, Any] | None
+    ) -> None:
+        """
+        Cache a computed result and report its search statistics.
+        """
+        self.fetch_rounds[plan.rounds] += 1
+        self.result_cache.put(cache_key, tuple(tuple(values) for values in results))
+        if stats is not None:
+            stats["cached"] = False
+            stats["rounds"] = plan.rounds
+            stats["fetch_limit"] = max(plan.text_limit, plan.image_limit)
+
+    async def _asearch_vectors(
+        self,
+        db: Any,
+        vectors: List[List[float]],
+        k: int,
+        search_filter: CatalogFilter | None
+        ) -> List[List[Tuple[Any, float]]]:
+        """
+        Search pre-computed query vectors under the upstream limit.
+        """
+        async with self.upstream_limit:
+            return await db.asimilarity_search_with_relevance_scores_by_vectors(
+                vectors, k=k, search_filter=search_filter
+            )
+
+    def _can_deepen(
+        self,
+        unformatted_results: List[List[Tuple[Any, float]]],
+        limits: List[int]
+    ) -> bool:
+        """
+        A larger limit can only add results for a list that came back full, whose weakest hit still
+        clears sim_threshold, and whose limit is below max_fetch_limit.
+        """
+        return any(
+            len(hits) >= limit
+            and limit < self.max_fetch_limit
+            and min(score for _, score in hits) > self.sim_threshold
+            for hits, limit in zip(unformatted_results, limits)
+            if hits
         )
-        ranked_results = ranked_results[:k]
+
+    def _rank_results(
+        self,
+        unformatted_results: List[List[Tuple[Any, float]]],
+        categories: List[str],
+        filters: Dict[str, Any] | None,
+        k: int,
+        image_bool: bool,
+        verbose: bool
+    ) -> Tuple[List[str], List[str], List[float], List[str], List[str]]:
+        """
+        Merge the per-query result lists with the configured ranking strategy, apply the
+        threshold and filters, and return the top k.
+        Each list must already be in rank order: by descending score from the vector stores,
+        or by fused rank when lexical hits were merged in. For image requests the last list
+        holds the image hits.
+        """
+        sources = [TEXT_SOURCE] * len(unformatted_results)
+        if image_bool and sources:
+            sources[-1] = IMAGE_SOURCE
+        candidates = Candidates(unformatted_results, sources)
+        strategy = self.image_ranking if image_bool else self.text_ranking
+
+        if verbose:
+            logging.info(f"""CATALOG RETRIEVER | retrieve() | Pre-ranking data ({strategy.name})
+                            \n\t| Similarities: {candidates.scores.tolist()}
+                            \n\t| Names: {[res[0].metadata['name'] for res in candidates.items]}""")
+
+        # Deduplicated, thresholded candidate order.
+        order = rank(candidates, strategy, self.sim_threshold)
+
+        # Filter in ranked order and keep the first k survivors, so a deeper search can backfill
+        # whatever the filters remove. The structured and category filters were already applied by
+        # the search and only guard against entities ingested without typed metadata.
+        # For image searches, ALWAYS return all results without category filtering
+        # Image similarity should determine relevance, not predefined categories
+        min_price, max_price = self._price_bounds(filters)
+        selected = []
+        rejected = 0
+        for index in order.tolist():
+            document = candidates.items[index][0]
+            if not self._within_price(document, min_price, max_price):
+                rejected += 1
+                continue
+            if not image_bool and not self._matches_categories(document, categories, verbose=verbose):
+                rejected += 1
+                continue
+            selected.append(index)
+            if len(selected) == k:
+                break
+        ranked_results = top_k_by_score(candidates, selected, k)
 
         if verbose:
             logging.info(
                 "CATALOG RETRIEVER | retrieve() | "
-                f"Ranked window after threshold+filters: {len(ranked_results)}"
+                f"Ranked window after threshold+filters: {len(ranked_results)} "
+                f"(candidates={len(candidates)}, above threshold={len(order)}, rejected by filters={rejected})"
             )
 
         final_texts = [res[0].page_content + f"\nPRICE: {res[0].metadata['price']}" for res in ranked_results]
@@ -566,79 +1753,52 @@ class Retriever:
 
         if verbose:
             logging.info(f"CATALOG RETRIEVER | retrieve() | \n\tnames: {final_names} \n\tsimilarities: {final_sims}")
+            logging.info(f"CATALOG RETRIEVER | length of output items: {len(final_names)}")
+        return final_texts, final_ids, final_sims, final_names, final_images
 
-        # Safely extract categories from texts
-        cat_list = []
-        for text in final_texts:
-            try:
-                # Text format: "name | description | category,subcategory"
-                # Extract the last part after | and split by comma
-                category_part = text.split("|")[-1].strip()
-                if "PRICE:" in category_part:
-                    # Handle malformed data where price info got mixed with category
-                    category_part = category_part.split("PRICE:")[0].strip()
-                
-                # Split by comma to get [category, subcategory]
-                parts = category_part.split(",")
-                cats = []
-                for part in parts:
-                    cleaned = part.strip().lower()
-                    if cleaned and not cleaned.startswith("/"):  # Skip malformed data like "/images/..."
-                        cats.append(cleaned)
-                cat_list.append(cats)
-            except Exception as e:
-                if verbose:
-                    logging.warning(f"CATALOG RETRIEVER | Error parsing category from: {text[:50]}... Error: {e}")
-                cat_list.append([])
-
-        if verbose:
-            logging.info(f"CATALOG RETRIEVER | pre-category filtering:\n\tCategories: {cat_list}\n\tUser input: {categories}")
-
-        # For image searches, ALWAYS return all results without category filtering
-        # Image similarity should determine relevance, not predefined categories
-        if image_bool:
-            if verbose:
-                logging.info("CATALOG RETRIEVER | Image search - returning all similarity-based results without category filtering")
-            return final_texts, final_ids, final_sims, final_names, final_images
-        
-        # For text searches, if no categories provided, return empty
-        if not categories:
-            if verbose:
-                logging.info("CATALOG RETRIEVER | No categories provided for text search, returning empty.")
-            return [], [], [], [], []
-
-        # Filter by category - check if any user category matches any product category/subcategory
-        filtered = []
-        for text, id_, sim, name, img, cats in zip(final_texts, 
-                                                   final_ids, 
-                                                   final_sims, 
-                                                   final_names, 
-                                                   final_images, 
-                                                   cat_list):
-            # Check if any user-provided category matches any product category/subcategory
-            match_found = False
-            for user_cat in categories:
-                user_cat_lower = user_cat.lower().strip()
-                for prod_cat in cats:
-                    # Check for partial match (e.g., "bag" matches "bags", "dress" matches "dresses")
-                    if user_cat_lower in prod_cat or prod_cat in user_cat_lower:
-                        match_found = True
-                        break
-                if match_found:
-                    break
-            
-            if match_found:
-                filtered.append((text, id_, sim, name, img))
-
-        if not filtered:
+    @staticmethod
+    def _parse_categories(text: str, verbose: bool = False) -> List[str]:
+        """
+        Safely extract the [category, subcategory] of a product from its text.
+        """
+        try:
+            # Text format: "name | description | category,subcategory"
+            # Extract the last part after | and split by comma
+            category_part = text.split("|")[-1].strip()
+            if "PRICE:" in category_part:
+                # Handle malformed data where price info got mixed with category
+                category_part = category_part.split("PRICE:")[0].strip()
+
+            # Split by comma to get [category, subcategory]
+            parts = category_part.split(",")
+            cats = []
+            for part in parts:
+                cleaned = part.strip().lower()
+                if cleaned and not cleaned.startswith("/"):  # Skip malformed data like "/images/..."
+                    cats.append(cleaned)
+            return cats
+        except Exception as e:
             if verbose:
-                logging.info("CATALOG RETRIEVER | No matches after category filtering.")
-            return [], [], [], [], []
+                logging.warning(f"CATALOG RETRIEVER | Error parsing category from: {text[:50]}... Error: {e}")
+            return []
 
-        texts_out, ids_out, sims_out, names_out, images_out = zip(*filtered)
-        if verbose:
-            logging.info(f"CATALOG RETRIEVER | length of output items: {len(names_out)}")
-        return list(texts_out), list(ids_out), list(sims_out), list(names_out), list(images_out)
+    def _matches_categories(
+        self,
+        document: Any,
+        categories: List[str],
+        verbose: bool = False
+    ) -> bool:
+        """
+        Check if any user category matches any product category/subcategory.
+        """
+        cats = self._parse_categories(document.page_content, verbose=verbose)
+        for user_cat in categories:
+            user_cat_lower = user_cat.lower().strip()
+            for prod_cat in cats:
+                # Check for partial match (e.g., "bag" matches "bags", "dress" matches "dresses")
+                if user_cat_lower in prod_cat or prod_cat in user_cat_lower:
+                    return True
+        return False
 
     @staticmethod
     def _coerce_float(value: Any) -> float | None:
@@ -655,40 +1815,65 @@ class Retriever:
                 return None
         return None
 
-    def _apply_structured_filters(
+    def _match_categories(self, categories: List[str]) -> List[str] | None:
+        """
+        Resolve the requested categories into the catalog values they match, using the same
+        partial matching as the category filter (e.g. "bag" matches "bags").
+        Returns None when the catalog vocabulary is unknown.
+        """
+        if not self.category_vocabulary:
+            return None
+        requested = [category.lower().strip() for category in categories]
+        return sorted(
+            value for value in self.category_vocabulary
+            if any(category in value or value in category for category in requested)
+        )
+
+    def _build_search_filter(
         self,
-        results: List[Tuple[Any, float]],
-        filters: Dict[str, Any] | None,
-        verbose: bool = False
-    ) -> List[Tuple[Any, float]]:
+        categories: List[str] | None,
+        filters: Dict[str, Any] | None
+    ) -> CatalogFilter | None:
         """
-        Apply structured metadata filters before assembling final response payloads.
+        Translate requested categories and structured filters into a CatalogFilter for the search.
         """
-        if not filters:
-            return results
+        filters = filters or {}
+        matched = self._match_categories(categories) if categories else None
+        partitions = None
+        if matched is not None and self.category_partitions and self.category_partition_map:
+            partitions = sorted({partition for value in matched for partition in self.category_partition_map.get(value, ())})
+        search_filter = CatalogFilter(
+            categories=matched,
+            partitions=partitions,
+            min_price=self._coerce_float(filters.get("min_price")),
+            max_price=self._coerce_float(filters.get("max_price")),
+        )
+        return None if search_filter.is_empty() else search_filter
 
-        min_price = self._coerce_float(filters.get("min_price"))
-        max_price = self._coerce_float(filters.get("max_price"))
+    def _price_bounds(self, filters: Dict[str, Any] | None) -> Tuple[float | None, float | None]:
+        """
+        Coerced (min_price, max_price) of the structured filters.
+        """
+        if not filters:
+            return None, None
+        return self._coerce_float(filters.get("min_price")), self._coerce_float(filters.get("max_price"))
 
+    def _within_price(
+        self,
+        document: Any,
+        min_price: float | None,
+        max_price: float | None
+    ) -> bool:
+        """
+        Apply the structured price filter to one result. Products without a usable price fail any bound.
+        """
         if min_price is None and max_price is None:
-            return results
-
-        filtered_results: List[Tuple[Any, float]] = []
-        for result in results:
-            doc = result[0]
-            price = self._coerce_float(doc.metadata.get("price"))
-            if price is None:
-                continue
-            if min_price is not None and price < min_price:
-                continue
-            if max_price is not None and price > max_price:
-                continue
-            filtered_results.append(result)
-
-        if verbose:
-            logging.info(
-                "CATALOG RETRIEVER | _apply_structured_filters() | "
-                f"filters={filters} | input={len(results)} | output={len(filtered_results)}"
-            )
-
-        return filtered_results
+            return True
+        price = self._coerce_float(document.metadata.get("price"))
+        if price is None or price != price:
+            return False
+        if min_price is not None and price < min_price:
+            return False
+        if max_price is not None and price > max_price:
+            return False
+        return True
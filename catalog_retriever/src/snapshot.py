@@ -0,0 +1,167 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Versioned catalog snapshots.
+
+A snapshot holds everything ingestion computes from the catalog CSV, so that new replicas
+start without a single embedding call:
+
+    <root>/<version>/
+        manifest.json           format, models, source CSV hash, row counts and dimensions
+        text.parquet            entity text and typed metadata (incl. content hash), per text entity
+        text_embeddings.npy     normalized float32 vectors, row-aligned with text.parquet
+        image.parquet           the same for the image collection
+        image_embeddings.npy
+        catalog_images.parquet  perceptual hash of every catalog image
+    <root>/LATEST               name of the newest version
+
+The version is derived from the content hashes and the embedding models, so rebuilding an
+unchanged catalog yields the same version. Snapshots are written to a temporary directory
+and renamed into place, so readers never see a partial one. Embeddings are memory-mapped on load.
+"""
+
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from .vectorstore import CONTENT_HASH_FIELD
+
+SNAPSHOT_FORMAT = 1
+COLLECTIONS = ("text", "image")
+LATEST_FILE = "LATEST"
+MANIFEST_FILE = "manifest.json"
+CATALOG_IMAGES_FILE = "catalog_images.parquet"
+# Column holding the entity text, i.e. the combined product text or the image path.
+ENTITY_TEXT_COLUMN = "entity_text"
+
+
+def file_sha256(path: str) -> str:
+    """sha256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def snapshot_version(content_hashes: List[str], text_model: str, image_model: str) -> str:
+    """Version of a catalog: changes with any row and with either embedding model."""
+    digest = hashlib.sha256(f"{text_model}\n{image_model}\n".encode("utf-8"))
+    for content_hash in sorted(content_hashes):
+        digest.update(content_hash.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def resolve_snapshot(path: str) -> str:
+    """A snapshot directory, or the one LATEST points to when given the snapshot root."""
+    latest = os.path.join(path, LATEST_FILE)
+    if os.path.exists(latest):
+        with open(latest, "r") as f:
+            return os.path.join(path, f.read().strip())
+    return path
+
+
+def write_snapshot(
+    root: str,
+    collections: Dict[str, Tuple[List[str], List[Dict[str, Any]], np.ndarray]],
+    catalog_images: Tuple[List[str], np.ndarray],
+    text_model: str,
+    image_model: str,
+    csv_path: str | None = None,
+) -> str:
+    """
+    Write one snapshot under root and point LATEST at it.
+    collections maps "text" and "image" to (entity texts, metadatas, normalized vectors).
+    Returns the snapshot directory. An existing snapshot of the same version is kept as is.
+    """
+    content_hashes = {
+        metadata[CONTENT_HASH_FIELD]
+        for _, metadatas, _ in collections.values()
+        for metadata in metadatas
+        if CONTENT_HASH_FIELD in metadata
+    }
+    version = snapshot_version(list(content_hashes), text_model, image_model)
+    target = os.path.join(root, version)
+    os.makedirs(root, exist_ok=True)
+
+    if os.path.exists(os.path.join(target, MANIFEST_FILE)):
+        logging.info(f"CATALOG RETRIEVER | write_snapshot() | Snapshot {version} already exists.")
+    else:
+        staging = tempfile.mkdtemp(prefix=f".{version}-", dir=root)
+        try:
+            manifest: Dict[str, Any] = {
+                "format": SNAPSHOT_FORMAT,
+                "version": version,
+                "created_at": time.time(),
+                "text_model": text_model,
+                "image_model": image_model,
+                "csv_sha256": file_sha256(csv_path) if csv_path else None,
+                "rows": len(content_hashes),
+                "collections": {},
+            }
+            for label in COLLECTIONS:
+                texts, metadatas, vectors = collections[label]
+                frame = pd.DataFrame.from_records(metadatas)
+                frame.insert(0, ENTITY_TEXT_COLUMN, texts)
+                frame.to_parquet(os.path.join(staging, f"{label}.parquet"), index=False)
+                np.save(os.path.join(staging, f"{label}_embeddings.npy"), np.ascontiguousarray(vectors, dtype=np.float32))
+                manifest["collections"][label] = {
+                    "entities": len(texts),
+                    "dimension": int(vectors.shape[1]) if len(texts) else 0,
+                }
+            images, hashes = catalog_images
+            pd.DataFrame({"image": images, "dhash": np.asarray(hashes, dtype=np.uint64)}).to_parquet(
+                os.path.join(staging, CATALOG_IMAGES_FILE), index=False
+            )
+            # The manifest goes last: a directory without one is never read.
+            with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f, indent=2)
+            os.rename(staging, target)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        logging.info(f"CATALOG RETRIEVER | write_snapshot() | Wrote snapshot {version} to {target}.")
+
+    pointer = os.path.join(root, f".{LATEST_FILE}.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(root, LATEST_FILE))
+    return target
+
+
+class CatalogSnapshot:
+    """
+    A snapshot read back from disk. Embeddings are memory-mapped read-only, so loading
+    costs only the metadata parse and pages are shared between processes on the same host.
+    """
+    def __init__(self, path: str):
+        self.path = resolve_snapshot(path)
+        with open(os.path.join(self.path, MANIFEST_FILE), "r") as f:
+            self.manifest: Dict[str, Any] = json.load(f)
+        if self.manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported catalog snapshot format {self.manifest.get('format')} in {self.path}")
+        self.version: str = self.manifest["version"]
+
+        self.collections: Dict[str, Tuple[List[str], List[Dict[str, Any]], np.ndarray]] = {}
+        for label in COLLECTIONS:
+            frame = pd.read_parquet(os.path.join(self.path, f"{label}.parquet"))
+            texts = frame.pop(ENTITY_TEXT_COLUMN).tolist()
+            vectors = np.load(os.path.join(self.path, f"{label}_embeddings.npy"), mmap_mode="r")
+            if len(vectors) != len(texts):
+                raise ValueError(f"Catalog snapshot {self.path} has {len(vectors)} {label} vectors for {len(texts)} entities")
+            self.collections[label] = (texts, frame.to_dict(orient="records"), vectors)
+
+        images = pd.read_parquet(os.path.join(self.path, CATALOG_IMAGES_FILE))
+        self.catalog_images: Tuple[List[str], np.ndarray] = (
+            images["image"].tolist(),
+            images["dhash"].to_numpy(dtype=np.uint64),
+        )
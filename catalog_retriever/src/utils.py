@@ -8,6 +8,7 @@ import re
 from PIL import Image
 import logging
 import sys
+from typing import Tuple
 
 logging.basicConfig(
     level=logging.INFO,
@@ -140,3 +141,109 @@ def resize_base64_image(base64_string: str, max_width: int = 256, max_height: in
     except Exception as e:
         logging.error(f"Error resizing image: {e}")
         return None
+
+def prepare_image_input(text: str, verbose: bool = False) -> str | None:
+    """
+    Turn an image URL, path or base64 string into a base64 payload within the Milvus size limit.
+    Defined at module level so it can run in a worker process.
+    Returns None if the image cannot be processed.
+    """
+    try:
+        input_data = text
+        if is_url(text):
+            input_data = image_url_to_base64(text)
+        elif is_path(text):
+            input_data = image_path_to_base64(text)
+
+        MAX_VARCHAR_LENGTH = 65535
+        if len(input_data) > MAX_VARCHAR_LENGTH:
+            if verbose:
+                logging.info(f"CATALOG RETRIEVER | Image too large ({len(input_data)} bytes), resizing...")
+            # Try to resize the image
+            resized = resize_base64_image(input_data)
+            if resized and len(resized) <= MAX_VARCHAR_LENGTH:
+                input_data = resized
+                if verbose:
+                    logging.info(f"CATALOG RETRIEVER | Image resized successfully to {len(input_data)} bytes")
+            else:
+                if verbose:
+                    logging.warning(f"CATALOG RETRIEVER | Failed to resize image or still too large after resize")
+                input_data = None 
+    except Exception as e:
+        if verbose:
+            logging.error(f"CATALOG RETRIEVER | Error processing image for batching: {e}")
+        input_data = None
+    return input_data
+
+def image_dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: one bit per horizontally adjacent pixel pair of a small grayscale copy.
+    Near-identical images (re-encoded, rescaled, screenshotted) get hashes a few bits apart.
+    """
+    gray = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            offset = row * (hash_size + 1) + col
+            bits = (bits << 1) | (pixels[offset] > pixels[offset + 1])
+    return bits
+
+def base64_dhash(base64_string: str | None) -> int | None:
+    """
+    dHash of a base64 image or data URI, or None if it cannot be decoded.
+    """
+    if not base64_string:
+        return None
+    try:
+        base64_data = base64_string.split(',', 1)[1] if base64_string.startswith('data:') else base64_string
+        return image_dhash(Image.open(io.BytesIO(base64.b64decode(base64_data))))
+    except Exception as e:
+        logging.debug(f"CATALOG RETRIEVER | utils.base64_dhash() | Could not hash image: {e}")
+        return None
+
+def _thumbnail_bytes(data: bytes, max_width: int = 256, max_height: int = 256) -> Image.Image:
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    img.thumbnail((max_width, max_height))
+    return img
+
+def _jpeg_data_uri(img: Image.Image, quality: int = 85) -> str:
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=quality, optimize=True)
+    return f"data:image/jpeg;base64,{base64.b64encode(buffer.getbuffer()).decode('ascii')}"
+
+def prepare_image_bytes(data: bytes, max_width: int = 256, max_height: int = 256, quality: int = 85, verbose: bool = False) -> str | None:
+    """
+    Decode uploaded image bytes once, downscale them and return the base64 payload for the embedding NIM.
+    Defined at module level so it can run in a worker process.
+    Returns None if the image cannot be processed.
+    """
+    try:
+        return _jpeg_data_uri(_thumbnail_bytes(data, max_width, max_height), quality)
+    except Exception as e:
+        if verbose:
+            logging.error(f"CATALOG RETRIEVER | Error decoding uploaded image: {e}")
+        return None
+
+def prepare_query_image(image: str | bytes, verbose: bool = False) -> Tuple[str | None, int | None]:
+    """
+    Prepare a query image given either as raw bytes or as a URL, path or base64 string.
+    Returns the base64 payload and the dHash of the downscaled image, or None for either on failure.
+    Uploaded bytes are decoded once for both.
+    """
+    if isinstance(image, (bytes, bytearray)):
+        try:
+            img = _thumbnail_bytes(image)
+            return _jpeg_data_uri(img), image_dhash(img)
+        except Exception as e:
+            if verbose:
+                logging.error(f"CATALOG RETRIEVER | Error decoding uploaded image: {e}")
+            return None, None
+    payload = prepare_image_input(image, verbose)
+    return payload, base64_dhash(payload)
+
+def catalog_image_dhash(image: str) -> int | None:
+    """
+    dHash of a catalog image (URL, path or base64), prepared exactly like a query image.
+    """
+    return base64_dhash(prepare_image_input(image))
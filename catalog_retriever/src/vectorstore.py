@@ -0,0 +1,606 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Vector store backends for the catalog retriever.
+
+CatalogMilvus extends the langchain Milvus wrapper with a multi-vector search, so that
+every search entity of a request is answered by a single Milvus round trip (nq > 1).
+The async variant goes through the pymilvus AsyncMilvusClient and never blocks the event loop.
+
+NumpyVectorStore is an embedded, in-process alternative for small and medium catalogs.
+It keeps normalized float32 embeddings in one contiguous matrix (optionally memory-mapped
+from disk) and answers cosine top-k with a single matmul plus argpartition.
+
+Both backends expose the same search contract, so Retriever can use either one. Searches take
+an optional CatalogFilter on the typed category, subcategory and price fields, which Milvus
+evaluates as a boolean expression inside the ANN search and the NumPy index as a row mask. Products
+are partitioned by category (a Milvus partition key, per-category row sub-indexes in NumPy), so a
+search restricted to some categories only scans those. They also
+share the primitives used for incremental ingestion: every entity carries the content hash
+of its catalog row, and rows can be listed, deleted and have their vectors reused by hash.
+Image entities also carry the perceptual hash of their image, so it is computed only once.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from langchain_milvus import Milvus
+from pydantic import BaseModel
+import numpy as np
+import json
+import os
+import logging
+
+# Metadata field holding the hash of the catalog row an entity was built from.
+CONTENT_HASH_FIELD = "content_hash"
+
+# Metadata field of image entities holding the perceptual hash (dHash) of the image as 16 hex
+# digits, computed when the entity is inserted; empty when the image could not be read.
+IMAGE_HASH_FIELD = "image_dhash"
+
+# Scalar field products are partitioned on: a Milvus partition key, or the per-category
+# sub-indexes of the NumPy store.
+PARTITION_FIELD = "category"
+
+# Keeps Milvus filter expressions built from value lists to a reasonable size.
+EXPR_BATCH_SIZE = 256
+
+
+def _batches(values: List[Any], size: int = EXPR_BATCH_SIZE):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class CatalogFilter(BaseModel):
+    """
+    Structured filter pushed down into the vector search.
+    A row matches if its category or subcategory is one of `categories` (when given)
+    and its price lies within [min_price, max_price] (when given).
+    `partitions` lists the categories that can hold such rows, so only their partitions are searched.
+    """
+    categories: List[str] | None = None
+    partitions: List[str] | None = None
+    min_price: float | None = None
+    max_price: float | None = None
+
+    def is_empty(self) -> bool:
+        return self.categories is None and self.partitions is None and self.min_price is None and self.max_price is None
+
+    def to_expr(self) -> str:
+        """
+        Render the filter as a Milvus boolean expression.
+        The partition clause comes first and stands alone, so Milvus prunes the partitions it excludes.
+        """
+        clauses = []
+        if self.partitions is not None:
+            clauses.append(f"{PARTITION_FIELD} in {json.dumps(sorted(self.partitions))}")
+        if self.categories is not None:
+            values = json.dumps(sorted(self.categories))
+            clauses.append(f"(category in {values} or subcategory in {values})")
+        if self.min_price is not None:
+            clauses.append(f"price >= {self.min_price}")
+        if self.max_price is not None:
+            clauses.append(f"price <= {self.max_price}")
+        return " and ".join(clauses)
+
+    def mask(self, categories: np.ndarray, subcategories: np.ndarray, prices: np.ndarray) -> np.ndarray:
+        """Evaluate the filter over column arrays, returning a boolean row mask."""
+        mask = np.ones(len(prices), dtype=bool)
+        if self.partitions is not None:
+            mask &= np.isin(categories, list(self.partitions))
+        if self.categories is not None:
+            allowed = list(self.categories)
+            mask &= np.isin(categories, allowed) | np.isin(subcategories, allowed)
+        if self.min_price is not None:
+            mask &= prices >= self.min_price
+        if self.max_price is not None:
+            mask &= prices <= self.max_price
+        return mask
+
+
+class CatalogMilvus(Milvus):
+    """
+    Milvus vector store with batched search support.
+    """
+    _relevance_fn: Callable[[float], float] | None = None
+
+    def _search_output_fields(self) -> List[str]:
+        """Fields returned with each hit, matching what the langchain wrapper requests."""
+        if self.enable_dynamic_field:
+            return ["*"]
+        return self._remove_forbidden_fields(self.fields[:])
+
+    def count_entities(self) -> int:
+        """
+        Number of entities stored in the collection.
+        Uses a count(*) query, which also sees unflushed inserts, rather than flushing to make
+        num_entities exact: a flush seals the growing segments and blocks until they are persisted.
+        """
+        if not self.col:
+            return 0
+        try:
+            return int(self.col.query(expr="", output_fields=["count(*)"])[0]["count(*)"])
+        except Exception:
+            # count(*) needs a loaded collection; num_entities only counts persisted segments.
+            return self.col.num_entities
+
+    def is_partitioned(self) -> bool:
+        """
+        Whether the collection is partitioned on PARTITION_FIELD. A collection that does not exist
+        yet counts as partitioned, since it is created with the configured schema.
+        """
+        if not self.col:
+            return True
+        return any(
+            field.name == PARTITION_FIELD and getattr(field, "is_partition_key", False)
+            for field in self.col.schema.fields
+        )
+
+    def load_into_memory(self) -> None:
+        """Load the collection into query node memory, returning once it can be searched."""
+        if self.col:
+            self.col.load()
+
+    def stored_hashes(self) -> Set[str] | None:
+        """
+        Content hashes of every stored entity.
+        Returns None for collections created before content hashes were stored.
+        """
+        if not self.col:
+            return set()
+        if CONTENT_HASH_FIELD not in self.fields:
+            return None
+        hashes: Set[str] = set()
+        iterator = self.col.query_iterator(
+            batch_size=1000,
+            expr=f'{CONTENT_HASH_FIELD} != ""',
+            output_fields=[CONTENT_HASH_FIELD],
+        )
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                break
+            hashes.update(row[CONTENT_HASH_FIELD] for row in batch)
+        return hashes
+
+    def has_field(self, field: str) -> bool:
+        """Whether entities store the given metadata field. A collection that does not exist yet has every field."""
+        return not self.col or field in self.fields
+
+    def stored_image_hashes(self) -> Dict[str, str]:
+        """Perceptual hash of every stored image entity that has one, by entity text."""
+        if not self.col or IMAGE_HASH_FIELD not in self.fields:
+            return {}
+        hashes: Dict[str, str] = {}
+        iterator = self.col.query_iterator(
+            batch_size=1000,
+            expr=f'{IMAGE_HASH_FIELD} != ""',
+            output_fields=[self._text_field, IMAGE_HASH_FIELD],
+        )
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                break
+            hashes.update((row[self._text_field], row[IMAGE_HASH_FIELD]) for row in batch)
+        return hashes
+
+    def stored_vectors(self, texts: List[str]) -> Dict[str, List[float]]:
+        """Existing vectors for entities whose text matches, so unchanged content is not re-embedded."""
+        if not self.col or not texts:
+            return {}
+        vectors: Dict[str, List[float]] = {}
+        for batch in _batches(list(dict.fromkeys(texts))):
+            rows = self.client.query(
+                self.collection_name,
+                filter=f"{self._text_field} in {json.dumps(batch)}",
+                output_fields=[self._text_field, self._vector_field],
+            )
+            for row in rows:
+                vectors[row[self._text_field]] = row[self._vector_field]
+        return vectors
+
+    def all_documents(self) -> List[Document]:
+        """Every stored entity as a Document without its vector, e.g. to build the lexical index."""
+        if not self.col:
+            return []
+        output_fields = [field for field in self._search_output_fields() if field != self._vector_field]
+        documents: List[Document] = []
+        iterator = self.col.query_iterator(batch_size=1000, output_fields=output_fields)
+        while True:
+            batch = iterator.next()
+            if not batch:
+                iterator.close()
+                break
+            documents.extend(self._parse_document(row) for row in batch)
+        return documents
+
+    def delete_by_hashes(self, hashes: List[str]) -> None:
+        """Delete every entity built from one of the given catalog rows."""
+        for batch in _batches(hashes):
+            self.client.delete(self.collection_name, filter=f"{CONTENT_HASH_FIELD} in {json.dumps(batch)}")
+
+    def similarity_search_with_relevance_scores_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        search_filter: CatalogFilter | None = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search several query vectors at once.
+        Returns one list of (Document, relevance score) per input vector, in input order,
+        with scores mapped exactly as similarity_search_with_relevance_scores() does.
+        """
+        if not embeddings:
+            return []
+        if self.col is None:
+            return [[] for _ in embeddings]
+
+        search_results = self.client.search(
+            self.collection_name,
+            data=[list(embedding) for embedding in embeddings],
+            anns_field=self._vector_field,
+            search_params=self._as_list(self.search_params)[0],
+            limit=k,
+            filter=search_filter.to_expr() if search_filter else "",
+            output_fields=self._search_output_fields(),
+            timeout=self.timeout,
+        )
+        return self._parse_batched_results(search_results)
+
+    async def asimilarity_search_with_relevance_scores_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        search_filter: CatalogFilter | None = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Async counterpart of similarity_search_with_relevance_scores_by_vectors().
+        """
+        if not embeddings:
+            return []
+        if self.col is None:
+            return [[] for _ in embeddings]
+
+        search_results = await self.aclient.search(
+            self.collection_name,
+            data=[list(embedding) for embedding in embeddings],
+            anns_field=self._vector_field,
+            search_params=self._as_list(self.search_params)[0],
+            limit=k,
+            filter=search_filter.to_expr() if search_filter else "",
+            output_fields=self._search_output_fields(),
+            timeout=self.timeout,
+        )
+        return self._parse_batched_results(search_results)
+
+    def _relevance_score_fn(self) -> Callable[[float], float]:
+        """
+        The relevance mapping depends only on the index metric, so look it up once.
+        The langchain lookup lists the collection indexes over the network on every call.
+        """
+        if self._relevance_fn is None:
+            self._relevance_fn = self._select_relevance_score_fn()
+        return self._relevance_fn
+
+    def _parse_batched_results(self, search_results: Any) -> List[List[Tuple[Document, float]]]:
+        """Convert raw per-vector Milvus hits into (Document, relevance score) lists."""
+        relevance_fn = self._relevance_score_fn()
+        return [
+            [(self._parse_document(hit["entity"]), relevance_fn(hit["distance"])) for hit in hits]
+            for hits in search_results
+        ]
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process cosine-similarity index over a contiguous float32 matrix.
+
+    If a path is given, the index is persisted there as vectors.npy and documents.json
+    and reloaded on startup, with the vectors memory-mapped read-only.
+    Relevance scores use the same mapping as Milvus with the COSINE metric.
+
+    The vectors, texts and metadata live in one tuple that writers replace as a whole and
+    searches read once, so a search running during ingestion never mixes two revisions.
+    """
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        path: str | None = None,
+    ):
+        self.embedding_func = embedding_function
+        self.path = path
+        self._data: Tuple[np.ndarray, List[str], List[Dict[str, Any]]] = (np.zeros((0, 0), dtype=np.float32), [], [])
+        self._next_pk = 0
+        # (revision of _data, filter columns, per-category rows), built lazily for filtering.
+        self._columns: Tuple[Tuple, Tuple[np.ndarray, np.ndarray, np.ndarray], Dict[str, np.ndarray]] | None = None
+        if path and os.path.exists(os.path.join(path, "vectors.npy")):
+            self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_func
+
+    def _load(self) -> None:
+        """Memory-map the persisted vectors and read the documents back."""
+        vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(self.path, "documents.json"), "r") as f:
+            documents = json.load(f)
+        self._data = (vectors, documents["texts"], documents["metadatas"])
+        self._next_pk = documents["next_pk"]
+        logging.info(f"CATALOG RETRIEVER | NumpyVectorStore._load() | Loaded {len(self._data[1])} vectors from {self.path}.")
+
+    def persist(self) -> None:
+        """
+        Write the index to disk and re-open the vectors memory-mapped. Called once per ingestion,
+        not per batch. Both files are written aside and renamed into place, so the mapping held by
+        running searches is never truncated under them.
+        """
+        if not self.path:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        data = vectors, texts, metadatas = self._data
+        vectors_path = os.path.join(self.path, "vectors.npy")
+        documents_path = os.path.join(self.path, "documents.json")
+        with open(f"{vectors_path}.tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(vectors))
+        with open(f"{documents_path}.tmp", "w") as f:
+            json.dump({"texts": texts, "metadatas": metadatas, "next_pk": self._next_pk}, f)
+        os.replace(f"{vectors_path}.tmp", vectors_path)
+        os.replace(f"{documents_path}.tmp", documents_path)
+        mapped = (np.load(vectors_path, mmap_mode="r"), texts, metadatas)
+        # Keep the in-memory revision if a writer replaced it while the files were written.
+        if self._data is data:
+            self._data = mapped
+        logging.info(f"CATALOG RETRIEVER | NumpyVectorStore.persist() | Wrote {len(texts)} vectors to {self.path}.")
+
+    def drop(self) -> None:
+        """Remove every vector, in memory and on disk."""
+        self._data = (np.zeros((0, 0), dtype=np.float32), [], [])
+        self._next_pk = 0
+        if self.path:
+            for name in ("vectors.npy", "documents.json"):
+                if os.path.exists(os.path.join(self.path, name)):
+                    os.remove(os.path.join(self.path, name))
+
+    def count_entities(self) -> int:
+        """Number of vectors stored in the index."""
+        return len(self._data[1])
+
+    def load_into_memory(self) -> None:
+        """Page the memory-mapped vectors in and build the filter columns, so the first search does neither."""
+        data = self._data
+        if len(data[1]):
+            data[0].sum(dtype=np.float64)
+        self._scalar_columns(data)
+
+    def export(self) -> Tuple[List[str], List[Dict[str, Any]], np.ndarray]:
+        """Texts, metadata without primary keys, and the normalized vectors, row-aligned."""
+        vectors, texts, metadatas = self._data
+        return list(texts), [{key: value for key, value in metadata.items() if key != "pk"} for metadata in metadatas], vectors
+
+    def is_partitioned(self) -> bool:
+        """Always true: the per-category sub-indexes are built with the filter columns."""
+        return True
+
+    def load_arrays(self, texts: List[str], metadatas: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """
+        Replace the index with normalized vectors computed elsewhere, e.g. memory-mapped from a
+        catalog snapshot. The vectors are used as they are, without a copy; primary keys are renumbered.
+        """
+        self._data = (vectors, list(texts), [{**metadata, "pk": pk} for pk, metadata in enumerate(metadatas)])
+        self._next_pk = len(texts)
+
+    def stored_hashes(self) -> Set[str] | None:
+        """Content hashes of every stored vector."""
+        return {metadata[CONTENT_HASH_FIELD] for metadata in self._data[2] if CONTENT_HASH_FIELD in metadata}
+
+    def has_field(self, field: str) -> bool:
+        """Whether entries store the given metadata field. An empty index has every field."""
+        metadatas = self._data[2]
+        return not metadatas or field in metadatas[0]
+
+    def stored_image_hashes(self) -> Dict[str, str]:
+        """Perceptual hash of every stored image entry that has one, by entry text."""
+        _, texts, metadatas = self._data
+        return {text: metadata[IMAGE_HASH_FIELD] for text, metadata in zip(texts, metadatas) if metadata.get(IMAGE_HASH_FIELD)}
+
+    def stored_vectors(self, texts: List[str]) -> Dict[str, np.ndarray]:
+        """Existing vectors for entries whose text matches, so unchanged content is not re-embedded."""
+        wanted = set(texts)
+        vectors, stored_texts, _ = self._data
+        return {text: vectors[i] for i, text in enumerate(stored_texts) if text in wanted}
+
+    def all_documents(self) -> List[Document]:
+        """Every stored entry as a Document."""
+        data = self._data
+        return [self._document(data, index) for index in range(len(data[1]))]
+
+    def delete_by_hashes(self, hashes: List[str]) -> None:
+        """Delete every entry built from one of the given catalog rows. persist() writes the change to disk."""
+        doomed = set(hashes)
+        vectors, texts, metadatas = self._data
+        keep = [i for i, metadata in enumerate(metadatas) if metadata.get(CONTENT_HASH_FIELD) not in doomed]
+        if len(keep) == len(texts):
+            return
+        self._data = (np.ascontiguousarray(vectors[keep]), [texts[i] for i in keep], [metadatas[i] for i in keep])
+
+    def add_embeddings(
+        self,
+        texts: List[str],
+        embeddings: List[List[float]],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """
+        Append pre-computed embeddings. Primary keys are assigned sequentially and stored
+        in the metadata under "pk", as Milvus does with auto_id. persist() writes the change to disk.
+        """
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.where(norms == 0, 1, norms)
+
+        pks = list(range(self._next_pk, self._next_pk + len(texts)))
+        self._next_pk += len(texts)
+        vectors, stored_texts, stored_metadatas = self._data
+        self._data = (
+            np.concatenate([vectors, matrix]) if vectors.size else np.ascontiguousarray(matrix),
+            stored_texts + list(texts),
+            stored_metadatas + [{**metadata, "pk": pk} for metadata, pk in zip(metadatas, pks)],
+        )
+        return [str(pk) for pk in pks]
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        texts = list(texts)
+        return self.add_embeddings(texts, self.embedding_func.embed_documents(texts), metadatas)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        store = cls(embedding_function=embedding, **kwargs)
+        store.add_texts(texts, metadatas)
+        return store
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        """Map cosine similarity onto [0, 1] exactly like the Milvus COSINE metric."""
+        return lambda score: (score + 1) / 2.0
+
+    def _scalar_columns(self, data: Tuple) -> Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        Category, subcategory and price as arrays, built once per index revision for filtering,
+        together with the per-category sub-indexes (the sorted rows of every category).
+        """
+        cached = self._columns
+        if cached is None or cached[0] is not data:
+            metadatas = data[2]
+            columns = (
+                np.array([str(metadata.get("category", "")) for metadata in metadatas], dtype=object),
+                np.array([str(metadata.get("subcategory", "")) for metadata in metadatas], dtype=object),
+                np.array([metadata.get("price", np.nan) for metadata in metadatas], dtype=np.float64),
+            )
+            order = np.argsort(columns[0], kind="stable")
+            values, starts = np.unique(columns[0][order], return_index=True)
+            cached = self._columns = (data, columns, dict(zip(values, np.split(order, starts[1:]))))
+        return cached[1], cached[2]
+
+    def _top_k(
+        self,
+        data: Tuple,
+        queries: np.ndarray,
+        k: int,
+        search_filter: CatalogFilter | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cosine top-k for every query row: one matmul, then argpartition and a sort of the k winners.
+        With a filter, only the rows it admits are scored; with partitions, only the rows of those
+        categories are even looked at, so the cost follows the size of the requested categories.
+        Returns (indices, cosine scores), both shaped (nq, min(k, admitted rows)).
+        """
+        vectors = data[0]
+        if search_filter is not None and not search_filter.is_empty():
+            columns, partitions = self._scalar_columns(data)
+            if search_filter.partitions is not None:
+                rows = [partitions[value] for value in search_filter.partitions if value in partitions]
+                rows = np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+                allowed = rows[search_filter.mask(*(column[rows] for column in columns))]
+            else:
+                allowed = np.flatnonzero(search_filter.mask(*columns))
+            scores = queries @ vectors[allowed].T
+        else:
+            allowed = None
+            scores = queries @ vectors.T
+        n = scores.shape[1]
+        k = min(k, n)
+        if k < n:
+            candidates = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(n), scores.shape)
+        candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1)
+        indices = np.take_along_axis(candidates, order, axis=1)
+        if allowed is not None:
+            indices = allowed[indices]
+        return indices, np.take_along_axis(candidate_scores, order, axis=1)
+
+    def _document(self, data: Tuple, index: int) -> Document:
+        return Document(page_content=data[1][index], metadata=dict(data[2][index]))
+
+    def similarity_search_with_score_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        search_filter: CatalogFilter | None = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """Raw cosine scores for several query vectors."""
+        if not len(embeddings):
+            return []
+        data = self._data
+        if not data[1] or k <= 0:
+            return [[] for _ in embeddings]
+        queries = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+        indices, scores = self._top_k(data, queries, k, search_filter)
+        return [
+            [(self._document(data, index), float(score)) for index, score in zip(row_indices, row_scores)]
+            for row_indices, row_scores in zip(indices.tolist(), scores.tolist())
+        ]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        embedding = self.embedding_func.embed_query(query)
+        return self.similarity_search_with_score_by_vectors([embedding], k=k)[0]
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        **kwargs: Any,
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k)]
+
+    def similarity_search_with_relevance_scores_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        search_filter: CatalogFilter | None = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        Search several query vectors at once, with the same contract as CatalogMilvus.
+        """
+        relevance_fn = self._select_relevance_score_fn()
+        return [
+            [(doc, relevance_fn(score)) for doc, score in hits]
+            for hits in self.similarity_search_with_score_by_vectors(embeddings, k=k, search_filter=search_filter)
+        ]
+
+    async def asimilarity_search_with_relevance_scores_by_vectors(
+        self,
+        embeddings: Sequence[Sequence[float]],
+        k: int = 4,
+        search_filter: CatalogFilter | None = None,
+    ) -> List[List[Tuple[Document, float]]]:
+        """
+        The search is a local matmul with no I/O, so it runs inline on the event loop.
+        """
+        return self.similarity_search_with_relevance_scores_by_vectors(embeddings, k=k, search_filter=search_filter)
@@ -50,10 +50,11 @@ class State(BaseModel):
         context: Previous conversation context
         cart: User's shopping cart
         response: Generated response from agents
-        image: Base64 encoded image data (if provided)
+        image: Base64 encoded image data, or raw uploaded image bytes (if provided)
         retrieved: Dictionary of retrieved product information
         next_agent: Next agent to route to (set by planner)
         guardrails: Whether to enable content safety checks
+        speculation: Retrieval inputs/results computed while the planner was routing
         timings: Performance timing information
     """
     user_id: int = Field(..., description="Unique user identifier")
@@ -61,13 +62,17 @@ class State(BaseModel):
     context: str = Field(default="", description="Previous conversation context")
     cart: Cart = Field(default_factory=Cart, description="User's shopping cart")
     response: str = Field(default="", description="Generated response from agents")
-    image: str = Field(default="", description="Base64 encoded image data")
+    image: str | bytes = Field(default="", description="Base64 encoded image data or raw image bytes")
     retrieved: Dict[str, str] = Field(
         default_factory=dict,
         description="Dictionary of retrieved product information"
     )
     next_agent: str = Field(default="", description="Next agent to route to")
     guardrails: bool = Field(default=True, description="Enable content safety checks")
+    speculation: Dict[str, Any] = Field(
+        default_factory=dict,
+        description="Speculative retrieval inputs and results, consumed by the retriever"
+    )
     timings: Annotated[Dict[str, float], ior] = Field(
         default_factory=dict,
         description="Performance timing information for each step"
@@ -3,14 +3,10 @@
 
 from .agenttypes import Cart, State
 from .functions import add_to_cart_function, remove_from_cart_function, view_cart_function
-from openai import OpenAI
+from .upstream import UpstreamClients
 from openai.types.chat import ChatCompletionMessageParam
-import os
 import json
 import logging
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 import sys
 import time
 
@@ -34,6 +30,7 @@ class CartAgent():
     """
     def __init__(self,
         config,
+        upstreams: UpstreamClients | None = None,
     ) -> None:
         logging.info(f"CartAgent.__init__() | Initializing with llm_name={config.llm_name}, llm_port={config.llm_port}")
         self.llm_name = config.llm_name
@@ -41,34 +38,25 @@ class CartAgent():
         
         # Store configuration
         self.memory_retriever_url = config.memory_port
-        self.model = OpenAI(base_url=config.llm_port, api_key=os.environ["LLM_API_KEY"])
+        self.upstreams = upstreams if upstreams is not None else UpstreamClients(config)
+        self.model = self.upstreams.llm_client("cart")
         self.catalog_retriever_port = config.retriever_port
         self.categories = config.categories
-        self.retry_strategy = Retry(
-                total=3,                    
-                status_forcelist=[422, 429, 500, 502, 503, 504],  
-                allowed_methods=["POST"],   
-                backoff_factor=1            
-            )
         logging.info(f"CartAgent.__init__() | Initialization complete")
         
-    def _get_cart(self, user_id: int) -> Cart:
-        response = requests.get(f"{self.memory_retriever_url}/user/{user_id}/cart")
+    async def _get_cart(self, user_id: int) -> Cart:
+        response = await self.upstreams.memory.get(f"/user/{user_id}/cart")
         logging.info(f"CartAgent._get_cart() | Response text: {response.text}.")
         if response.status_code == 200:
             cart_data = json.loads(response.text)["cart"]
             return Cart(contents=cart_data)
         return Cart(contents=[])
 
-    def _add_to_cart(self, user_id: int, item_name: str, quantity: int) -> str:
+    async def _add_to_cart(self, user_id: int, item_name: str, quantity: int) -> str:
         # First we have to perfom a retrieval to ensure that the item being looked for is in the catalog.
-        adapter = HTTPAdapter(max_retries=self.retry_strategy)
-        session = requests.Session()
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
         logging.info(f"CartAgent.add_to_cart() | /query/text -- getting response\n\t| query: {item_name}\n\t")
-        ret_response = session.post(
-            f"{self.catalog_retriever_port}/query/text",
+        ret_response = await self.upstreams.catalog.post(
+            "/query/text",
             json={
                 "text": [item_name],
                 "categories": self.categories,
@@ -83,8 +71,8 @@ class CartAgent():
             if sim > 0.8:
                 catalog_item_name = res_json["names"][0]
                 logging.info(f"CartAgent.add_to_cart() | input name: {item_name}, retrieved item: {catalog_item_name}, sim: {sim}")
-                response = requests.post(
-                    f"{self.memory_retriever_url}/user/{user_id}/cart/add",
+                response = await self.upstreams.memory.post(
+                    f"/user/{user_id}/cart/add",
                     json={"item": catalog_item_name, "amount": quantity}
                 )
                 if response.status_code == 200:
@@ -96,15 +84,11 @@ class CartAgent():
         else:
             return f"No such item ({item_name}) could be found in the catalog."
 
-    def _remove_from_cart(self, user_id: int, item_name: str, quantity: int) -> str:
+    async def _remove_from_cart(self, user_id: int, item_name: str, quantity: int) -> str:
         # First we have to perfom a retrieval to ensure that the item being looked for is in the catalog.
-        adapter = HTTPAdapter(max_retries=self.retry_strategy)
-        session = requests.Session()
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
         logging.info(f"CartAgent.remove_from_cart() | /query/text -- getting response\n\t| query: {item_name}\n\t")
-        ret_response = session.post(
-            f"{self.catalog_retriever_port}/query/text",
+        ret_response = await self.upstreams.catalog.post(
+            "/query/text",
             json={
                 "text": [item_name],
                 "categories": self.categories,
@@ -119,8 +103,8 @@ class CartAgent():
             if sim > 0.8:
                 catalog_item_name = res_json["names"][0]
                 logging.info(f"CartAgent.remove_from_cart() | input name: {item_name}, retrieved item: {catalog_item_name}, sim: {sim}")
-                response = requests.post(
-                    f"{self.memory_retriever_url}/user/{user_id}/cart/remove",
+                response = await self.upstreams.memory.post(
+                    f"/user/{user_id}/cart/remove",
                     json={"item": catalog_item_name, "amount": quantity}
                 )
                 if response.status_code == 200:
@@ -132,15 +116,15 @@ class CartAgent():
         else:
             return f"No such item ({item_name}) could be found in the catalog."
 
-    def _update_context(self, user_id: int, context: str) -> None:
-        response = requests.post(
-            f"{self.memory_retriever_url}/user/{user_id}/context/add",
+    async def _update_context(self, user_id: int, context: str) -> None:
+        response = await self.upstreams.memory.post(
+            f"/user/{user_id}/context/add",
             json={"new_context": context}
         )
         if response.status_code != 200:
             logging.error(f"Failed to update context: {response.text}")
 
-    def invoke(
+    async def invoke(
         self,
         state: State,
         verbose : bool = True
@@ -165,7 +149,7 @@ class CartAgent():
         ]
 
         # Create the request parameters
-        response = self.model.chat.completions.create(
+        response = await self.model.chat.completions.create(
             model=self.llm_name,
             messages=messages,
             temperature=0.0,
@@ -191,18 +175,18 @@ class CartAgent():
             logging.info(f"CartAgent.invoke() | Adding to cart")
             item_name = tool_args["item_name"]
             quantity = tool_args["quantity"]
-            output_state.response = self._add_to_cart(state.user_id, item_name, quantity)
-            output_state.cart = self._get_cart(state.user_id)
+            output_state.response = await self._add_to_cart(state.user_id, item_name, quantity)
+            output_state.cart = await self._get_cart(state.user_id)
             
         elif tool_name == "remove_from_cart":
             logging.info(f"CartAgent.invoke() | Removing from cart")
             item_name = tool_args["item_name"]
             quantity = tool_args["quantity"]    
-            output_state.response = self._remove_from_cart(state.user_id, item_name, quantity)
-            output_state.cart = self._get_cart(state.user_id)
+            output_state.response = await self._remove_from_cart(state.user_id, item_name, quantity)
+            output_state.cart = await self._get_cart(state.user_id)
             
         elif tool_name == "view_cart":
-            cart = self._get_cart(state.user_id)
+            cart = await self._get_cart(state.user_id)
             logging.info(f"CartAgent.invoke() | Viewing cart.\n\t| Cart: {cart}")
             if len(cart.contents) == 0:
                 output_state.response = "Your cart is empty."
@@ -218,7 +202,7 @@ class CartAgent():
         if verbose:
             logging.info(f"CartAgent.invoke() | output_state: {output_state}")
         
-        #self._update_context(state.user_id, f"USER QUERY:{output_state.query}\nRESPONSE:{output_state.response}")
+        #await self._update_context(state.user_id, f"USER QUERY:{output_state.query}\nRESPONSE:{output_state.response}")
         end = time.monotonic()
         output_state.context = output_state.context + f"\nAgent Response: {output_state.response}"
         output_state.timings["cart"] = end - start
@@ -2,11 +2,10 @@
 # SPDX-License-Identifier: Apache-2.0
 
 from typing import AsyncGenerator
-from openai import AsyncOpenAI
 from langgraph.config import get_stream_writer
 from .agenttypes import State
+from .upstream import UpstreamClients
 import json
-import os
 import logging
 import sys
 import time
@@ -23,22 +22,21 @@ def setup_logging():
 
 
 class ChatterAgent:
-    def __init__(self, config):
+    def __init__(self, config, upstreams: UpstreamClients | None = None):
         """
         Initialize the ChatterAgent with LLM configuration.
         
         Args:
             config: Configuration instance
+            upstreams: Shared upstream HTTP clients; created from config if not given
         """
         logging.info(f"ChatterAgent.__init__() | Initializing with llm_name={config.llm_name}, llm_port={config.llm_port}")
         self.llm_name = config.llm_name
         self.llm_port = config.llm_port
         self.config = config
         
-        self.model = AsyncOpenAI(
-            base_url=config.llm_port, 
-            api_key=os.environ["LLM_API_KEY"]
-        )
+        self.upstreams = upstreams if upstreams is not None else UpstreamClients(config)
+        self.model = self.upstreams.llm_client("chatter")
         logging.info(f"ChatterAgent.__init__() | Initialization complete")
 
     async def invoke(
@@ -62,6 +62,70 @@ def load_config_with_override(base_config_path: str) -> Dict[str, Any]:
     return config
 
 
+class UpstreamConfig(BaseModel):
+    """Connection pool, timeout and retry policy of one upstream service."""
+
+    max_connections: int = Field(64, description="Maximum open connections to the upstream")
+    max_keepalive_connections: int = Field(32, description="Idle connections kept open for reuse")
+    keepalive_expiry: float = Field(30.0, description="Seconds an idle connection is kept open")
+    timeout: float = Field(10.0, description="Read/write/pool timeout in seconds")
+    connect_timeout: float = Field(2.0, description="Connect timeout in seconds")
+    retries: int = Field(0, description="Retries after a transport error or a retryable status")
+    backoff_factor: float = Field(0.5, description="Retry n waits backoff_factor * 2 ** (n - 1) seconds")
+    retry_statuses: List[int] = Field(
+        default_factory=lambda: [429, 500, 502, 503, 504],
+        description="HTTP statuses that are retried"
+    )
+    retry_methods: List[str] = Field(
+        default_factory=lambda: ["GET"],
+        description="HTTP methods that are retried by default; other calls opt in per request"
+    )
+
+    class Config:
+        """Pydantic configuration."""
+        extra = "forbid"
+
+
+def default_upstreams() -> Dict[str, UpstreamConfig]:
+    """Pools for the memory retriever, catalog retriever, guardrails and LLM services."""
+    return {
+        # Cart writes are not idempotent, so only reads are retried.
+        "memory": UpstreamConfig(retries=2),
+        # Catalog queries are reads sent as POST and are retried like the previous requests sessions.
+        "catalog": UpstreamConfig(
+            timeout=30.0,
+            retries=3,
+            backoff_factor=1.0,
+            retry_statuses=[422, 429, 500, 502, 503, 504],
+            retry_methods=["GET", "POST"],
+        ),
+        # Rails checks fail open, so a slow rails service is not retried.
+        "rails": UpstreamConfig(),
+        # Shared by every agent's AsyncOpenAI client, which retries on its own (retries is
+        # passed as max_retries). Agents set their own timeouts in llm_timeouts.
+        "llm": UpstreamConfig(
+            max_connections=256,
+            max_keepalive_connections=64,
+            timeout=120.0,
+            connect_timeout=5.0,
+            retries=2,
+        ),
+    }
+
+
+def default_llm_timeouts() -> Dict[str, float]:
+    """Seconds each agent waits for an LLM response before giving up."""
+    return {
+        "planner": 15.0,
+        "retriever": 30.0,
+        "cart": 30.0,
+        "chatter": 120.0,
+        "summary": 120.0,
+        # Query embeddings for the local router; on timeout the planner asks the LLM.
+        "router": 2.0,
+    }
+
+
 class ChainServerConfig(BaseModel):
     """Configuration class for the chain server application."""
     
@@ -90,6 +154,29 @@ class ChainServerConfig(BaseModel):
     # Safety Configuration
     unsafe_message: str = Field(..., description="Message to display for unsafe content")
     
+    # Upstream HTTP clients
+    upstreams: Dict[str, UpstreamConfig] = Field(
+        default_factory=default_upstreams,
+        description="Per-upstream connection pool and retry policy (memory, catalog, rails, llm)"
+    )
+    llm_timeouts: Dict[str, float] = Field(
+        default_factory=default_llm_timeouts,
+        description="Per-agent LLM request timeout in seconds (planner, retriever, cart, chatter, summary, router)"
+    )
+    
+    # Local routing ahead of the planner LLM
+    router_enabled: bool = Field(True, description="Route with local rules and centroids before asking the LLM")
+    router_threshold: float = Field(0.8, description="Minimum confidence of a local routing decision")
+    router_temperature: float = Field(0.05, description="Softmax temperature of the centroid classifier")
+    router_embed_port: Optional[str] = Field(None, description="Embedding endpoint for the centroid classifier")
+    router_embed_model: str = Field("nvidia/nv-embedqa-e5-v5", description="Embedding model of the centroid classifier")
+    router_centroids_path: Optional[str] = Field(None, description="Centroids written by app.train_router")
+    router_log_path: Optional[str] = Field(None, description="JSONL file that LLM routing decisions are appended to")
+    
+    # Speculative retrieval alongside the planner
+    speculative_retrieval: bool = Field(False, description="Extract retrieval inputs while the planner routes")
+    speculative_catalog_query: bool = Field(False, description="Also query the catalog before the planner decides")
+    
     @validator('llm_port', 'retriever_port', 'memory_port', 'rails_port')
     def validate_urls(cls, v):
         """Validate that URLs are properly formatted."""
@@ -97,6 +184,20 @@ class ChainServerConfig(BaseModel):
             raise ValueError(f"URL must start with http:// or https://: {v}")
         return v
     
+    @validator('router_embed_port')
+    def validate_optional_url(cls, v):
+        """Validate that an optional URL is properly formatted."""
+        if v is not None and not v.startswith(('http://', 'https://')):
+            raise ValueError(f"URL must start with http:// or https://: {v}")
+        return v
+    
+    @validator('router_threshold')
+    def validate_router_threshold(cls, v):
+        """Validate the router threshold is a probability."""
+        if not 0.0 <= v <= 1.0:
+            raise ValueError("router_threshold must be between 0 and 1")
+        return v
+    
     @validator('memory_length')
     def validate_memory_length(cls, v):
         """Validate memory length is positive."""
@@ -111,6 +212,31 @@ class ChainServerConfig(BaseModel):
             raise ValueError("top_k_retrieve must be positive")
         return v
     
+    @validator('upstreams', pre=True)
+    def merge_upstreams(cls, v):
+        """Fill in the default policy of every upstream that is not configured."""
+        merged = default_upstreams()
+        for name, value in (v or {}).items():
+            if name not in merged:
+                raise ValueError(f"Unknown upstream '{name}', expected one of {sorted(merged)}")
+            if isinstance(value, UpstreamConfig):
+                merged[name] = value
+            else:
+                merged[name] = UpstreamConfig(**{**merged[name].model_dump(), **value})
+        return merged
+    
+    @validator('llm_timeouts', pre=True)
+    def merge_llm_timeouts(cls, v):
+        """Fill in the default timeout of every agent that is not configured."""
+        merged = default_llm_timeouts()
+        for name, value in (v or {}).items():
+            if name not in merged:
+                raise ValueError(f"Unknown agent '{name}' in llm_timeouts, expected one of {sorted(merged)}")
+            if value <= 0:
+                raise ValueError(f"llm_timeouts['{name}'] must be positive")
+            merged[name] = value
+        return merged
+    
     @validator('categories', 'agent_choices')
     def validate_lists_not_empty(cls, v):
         """Validate that lists are not empty."""
@@ -8,17 +8,20 @@ This module defines the topology and flow of the shopping assistant using LangGr
 connecting various specialized agents to handle different types of user queries.
 """
 from typing import Any
+import asyncio
 import time
 import logging
-import requests
 import json
 import sys
 
+import httpx
+
 from langgraph.graph import StateGraph, START, END
 from langgraph.config import get_stream_writer
 from langchain_core.runnables import RunnablePassthrough
 
 from .agenttypes import State, Cart, Rail
+from .upstream import UpstreamClients
 
 
 # Configure logging
@@ -32,6 +35,8 @@ logger = logging.getLogger(__name__)
 
 # Global configuration variable
 _config = None
+# Shared upstream HTTP clients
+_upstreams: UpstreamClients | None = None
 
 
 class GraphNodes:
@@ -44,21 +49,20 @@ class GraphNodes:
         logger.info(f"GraphNodes.get_memory() | Retrieving memory for user {state.user_id}")
         
         try:
-            # Retrieve memory from the memory database
-            memory_response = requests.get(
-                f"{_config.memory_port}/user/{state.user_id}/context",
-                timeout=10
-            )
-            memory_response.raise_for_status()
-            memory = memory_response.json()
-            
-            # Retrieve cart from the memory database
-            cart_response = requests.get(
-                f"{_config.memory_port}/user/{state.user_id}/cart",
-                timeout=10
-            )
-            cart_response.raise_for_status()
-            cart = cart_response.json()
+            # Retrieve memory and cart from the memory database in one round trip
+            state_response = await _upstreams.memory.get(f"/user/{state.user_id}/state")
+            if state_response.status_code == 404:
+                # Memory services that predate /state: fetch both separately
+                memory_response, cart_response = await asyncio.gather(
+                    _upstreams.memory.get(f"/user/{state.user_id}/context"),
+                    _upstreams.memory.get(f"/user/{state.user_id}/cart"),
+                )
+                memory_response.raise_for_status()
+                cart_response.raise_for_status()
+                memory, cart = memory_response.json(), cart_response.json()
+            else:
+                state_response.raise_for_status()
+                memory = cart = state_response.json()
 
             logger.info(f"GraphNodes.get_memory() | Memory retrieved: {memory}, Cart: {cart}")
             
@@ -71,7 +75,7 @@ class GraphNodes:
             
             return state
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"GraphNodes.get_memory() | Failed to retrieve memory: {e}")
             # Return state with empty context/cart on failure
             state.context = ""
@@ -88,10 +92,9 @@ class GraphNodes:
         start = time.monotonic()
         
         try:
-            response = requests.post(
-                f"{_config.rails_port}/rail/input/check",
-                json={"user_id": state.user_id, "query": state.query},
-                timeout=10
+            response = await _upstreams.rails.post(
+                "/rail/input/check",
+                json={"user_id": state.user_id, "query": state.query}
             )
             response.raise_for_status()
             
@@ -108,7 +111,7 @@ class GraphNodes:
                 "rail_timings": {"rails_input_check": end - start}
             }
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Failed to check input safety: {e}")
             # Default to safe on failure
             return {
@@ -125,10 +128,9 @@ class GraphNodes:
         start = time.monotonic()
         
         try:
-            response = requests.post(
-                f"{_config.rails_port}/rail/output/check",
-                json={"user_id": state.user_id, "query": state.response},
-                timeout=10
+            response = await _upstreams.rails.post(
+                "/rail/output/check",
+                json={"user_id": state.user_id, "query": state.response}
             )
             response.raise_for_status()
             
@@ -145,7 +147,7 @@ class GraphNodes:
                 "rail_timings": {"rails_output_check": end - start}
             }
             
-        except requests.RequestException as e:
+        except httpx.HTTPError as e:
             logger.error(f"Failed to check output safety: {e}")
             # Default to safe on failure
             return {
@@ -188,7 +190,8 @@ def create_graph(
     planner_agent: Any,
     chatter_agent: Any,
     summary_agent: Any,
-    config
+    config,
+    upstreams: UpstreamClients | None = None
 ) -> StateGraph:
     """
     Create the LangGraph for the shopping assistant.
@@ -208,6 +211,8 @@ def create_graph(
         planner_agent: Agent for query routing
         chatter_agent: Agent for natural language responses
         summary_agent: Agent for response summarization
+        config: Configuration instance
+        upstreams: Shared upstream HTTP clients; created from config if not given
     
     Returns:
         Compiled LangGraph instance
@@ -215,8 +220,9 @@ def create_graph(
     logger.info("Creating shopping assistant graph")
     
     # Set the global config for use throughout the graph
-    global _config
+    global _config, _upstreams
     _config = config
+    _upstreams = upstreams if upstreams is not None else UpstreamClients(config)
     
     # Create the graph
     graph = StateGraph(State)
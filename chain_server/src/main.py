@@ -7,7 +7,7 @@ Main FastAPI application for the Shopping Assistant API.
 This module provides the main API endpoints for the shopping assistant,
 including query processing and streaming responses.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
@@ -25,6 +25,7 @@ from .chatter import ChatterAgent
 from .summarizer import SummaryAgent
 from .graph import create_graph
 from .config import load_config
+from .upstream import UpstreamClients
 
 # Configure logging
 logging.basicConfig(
@@ -35,24 +36,31 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def initialize_agents(config) -> Dict:
+def initialize_agents(config, upstreams: UpstreamClients) -> Dict:
     """Initialize all agent instances."""
+    retriever_agent = RetrieverAgent(config=config, upstreams=upstreams)
     return {
-        'planner_agent': PlannerAgent(config=config),
-        'retriever_agent': RetrieverAgent(config=config),
-        'cart_agent': CartAgent(config=config),
-        'chatter_agent': ChatterAgent(config=config),
-        'summary_agent': SummaryAgent(config=config)
+        'planner_agent': PlannerAgent(
+            config=config,
+            upstreams=upstreams,
+            speculator=retriever_agent if config.speculative_retrieval else None
+        ),
+        'retriever_agent': retriever_agent,
+        'cart_agent': CartAgent(config=config, upstreams=upstreams),
+        'chatter_agent': ChatterAgent(config=config, upstreams=upstreams),
+        'summary_agent': SummaryAgent(config=config, upstreams=upstreams)
     }
 
 
 # Load configuration and initialize agents
 try:
     config = load_config()  # Load and validate configuration
-    agents = initialize_agents(config)
+    upstreams = UpstreamClients(config)  # Pooled HTTP clients shared by every node and agent
+    agents = initialize_agents(config, upstreams)
     graph = create_graph(
         **agents,
-        config=config
+        config=config,
+        upstreams=upstreams
     )
 except Exception as e:
     logger.error(f"Failed to initialize application: {e}")
@@ -65,6 +73,12 @@ app = FastAPI(
     version="1.0.0"
 )
 
+@app.on_event("shutdown")
+async def close_upstreams():
+    """Close the upstream connection pools."""
+    await upstreams.aclose()
+
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -80,7 +94,7 @@ class QueryRequest(BaseModel):
     """Request model for shopping queries."""
     user_id: int
     query: str
-    image: str = ""
+    image: str | bytes = ""
     context: Optional[str] = ""
     cart: Optional[Cart] = None
     retrieved: Optional[Dict[str, str]] = {}
@@ -95,6 +109,30 @@ class QueryResponse(BaseModel):
     timings: Dict[str, float] = {}
 
 
+async def parse_query_request(request: Request) -> QueryRequest:
+    """
+    Read a query from a JSON body, or from multipart/form-data with the image as a
+    binary "image" file part. cart and retrieved form fields are JSON encoded.
+    Binary uploads avoid inflating the image by a third with base64.
+    """
+    content_type = request.headers.get("content-type", "")
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            fields = {key: value for key, value in form.items() if key != "image"}
+            for key in ("cart", "retrieved"):
+                if key in fields:
+                    fields[key] = json.loads(fields[key])
+            query_request = QueryRequest(**fields)
+            upload = form.get("image")
+            if upload is not None and not isinstance(upload, str):
+                query_request.image = await upload.read()
+            return query_request
+        return QueryRequest.model_validate(await request.json())
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
 def create_initial_state(request: QueryRequest) -> State:
     """Create initial state from request."""
     return State(
@@ -107,13 +145,14 @@ def create_initial_state(request: QueryRequest) -> State:
     )
 
 @app.post("/query/stream")
-async def process_query_stream(request: QueryRequest):
+async def process_query_stream(raw_request: Request):
     """
     Stream responses to user queries in real-time.
     
     This endpoint provides streaming responses for responsive UIs
-    and chat-like experiences.
+    and chat-like experiences. Accepts JSON or multipart/form-data.
     """
+    request = await parse_query_request(raw_request)
     try:
         logger.info(f"chain-server | /query/stream | Processing streaming query for user {request.user_id}: {request.query}")
         
@@ -141,12 +180,14 @@ async def process_query_stream(request: QueryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/query/timing", response_model=QueryResponse)
-async def process_query_timing(request: QueryRequest):
+async def process_query_timing(raw_request: Request):
     """
     Process a query and return detailed timing information.
     
     This endpoint is useful for performance analysis and debugging.
+    Accepts JSON or multipart/form-data.
     """
+    request = await parse_query_request(raw_request)
     try:
         logger.info(f"chain-server | /query/timing | Processing timing query for user {request.user_id}: {request.query}")
         
@@ -177,6 +218,12 @@ async def process_query_timing(request: QueryRequest):
         logger.error(f"Error processing timing query: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
         
+@app.get("/stats")
+async def stats():
+    """Speculative retrieval hit and waste rates since startup."""
+    return {"speculation": agents["planner_agent"].speculation_stats()}
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
@@ -198,6 +245,7 @@ async def root():
             "stream": "/query/stream",
             "timing": "/query/timing",
             "health": "/health",
+            "stats": "/stats",
             "docs": "/docs"
         }
     } 
\ No newline at end of file
@@ -7,14 +7,14 @@ Query routing agent for the Shopping Assistant.
 This module contains the PlannerAgent that determines which specialized agent
 should handle a user's query based on the query content and context.
 """
-import os
+import asyncio
 import logging
 import sys
 import time
-from typing import Tuple, Dict, List
-from openai import OpenAI
-
+from typing import Any, Tuple, Dict, List, Optional
 from .agenttypes import State, Cart
+from .upstream import UpstreamClients
+from .router import QueryRouter, RouteDecision
 
 
 # Configure logging
@@ -29,6 +29,26 @@ logger = logging.getLogger(__name__)
 # Configuration will be loaded by the main application
 
 
+class Speculation:
+    """Speculative retrieval work running alongside the routing decision."""
+    
+    def __init__(self, coro) -> None:
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.task = asyncio.ensure_future(coro)
+        self.task.add_done_callback(self._done)
+    
+    def _done(self, task: asyncio.Task) -> None:
+        self.finished = time.monotonic()
+        # Mark failures of discarded speculations as retrieved, so asyncio does not warn about them.
+        if not task.cancelled():
+            task.exception()
+    
+    def overlap(self, until: float) -> float:
+        """Seconds of speculative work done before until."""
+        return (min(self.finished, until) if self.finished is not None else until) - self.started
+
+
 class PlannerAgent:
     """
     Agent responsible for routing user queries to appropriate specialized agents.
@@ -37,15 +57,29 @@ class PlannerAgent:
     handled by the cart agent, retriever agent, visualizer agent, or chatter agent.
     """
     
+    # Map common variations to standard names
+    AGENT_ALIASES = {
+        "search": "retriever",
+        "cart_node": "cart",
+        "product_finder": "retriever",
+        "general": "chatter",
+        "assistant": "chatter"
+    }
+    
     def __init__(
         self,
         config,
+        upstreams: UpstreamClients | None = None,
+        speculator: Any = None,
     ) -> None:
         """
         Initialize the PlannerAgent.
         
         Args:
             config: Configuration instance
+            upstreams: Shared upstream HTTP clients; created from config if not given
+            speculator: Agent whose speculate(state) runs while routing, e.g. the
+                RetrieverAgent when speculative_retrieval is enabled
         """
         logger.info(f"PlannerAgent.__init__() | llm_name={config.llm_name}, llm_port={config.llm_port}")
         
@@ -56,10 +90,12 @@ class PlannerAgent:
         
         # Initialize the LLM client
         try:
-            self.model = OpenAI(
-                base_url=self.llm_port,
-                api_key=os.environ.get("LLM_API_KEY")
-            )
+            self.upstreams = upstreams if upstreams is not None else UpstreamClients(config)
+            self.model = self.upstreams.llm_client("planner")
+            self.router = QueryRouter(config, self.upstreams) if config.router_enabled else None
+            self.speculator = speculator
+            self.speculation_counts = {"hits": 0, "misses": 0, "failures": 0}
+            self.speculation_seconds = {"saved": 0.0, "wasted": 0.0}
             logger.info("PlannerAgent.__init__() | initialization complete")
         except Exception as e:
             logger.error(f"Failed to initialize PlannerAgent: {e}")
@@ -86,12 +122,14 @@ class PlannerAgent:
             }
         ]
 
-    def _call_llm_for_routing(self, query: str) -> str:
+    async def _call_llm_for_routing(self, query: str, raw_query: str = "") -> str:
         """
         Call the LLM to determine the appropriate agent for the query.
         
         Args:
             query: The user's query
+            raw_query: The query as the user typed it; valid decisions for it are
+                logged as training data for the local router
             
         Returns:
             The name of the agent to route to
@@ -99,7 +137,7 @@ class PlannerAgent:
         try:
             messages = self._create_routing_messages(query)
             
-            response = self.model.chat.completions.create(
+            response = await self.model.chat.completions.create(
                 model=self.llm_name,
                 messages=messages,
                 temperature=0.0,
@@ -109,12 +147,59 @@ class PlannerAgent:
             response_content = response.choices[0].message.content.strip().lower()
             logger.debug(f"LLM routing response: {response_content}")
             
+            agent = self.AGENT_ALIASES.get(response_content, response_content)
+            if self.router is not None and agent in self.agent_choices:
+                self.router.log_decision(raw_query, agent, "llm")
+            
             return response_content
             
         except Exception as e:
             logger.error(f"Error calling LLM for routing: {e}")
             return "chatter"  # Default to chatter on error
 
+    def _is_confident(self, decision: Optional[RouteDecision]) -> bool:
+        """Whether a local routing decision is good enough to skip the LLM."""
+        return decision is not None and decision.confidence >= self.router.threshold
+
+    async def _settle_speculation(self, speculation: Speculation, agent: str, state: State) -> None:
+        """
+        Hand speculative results to the retriever, or cancel them when routing went elsewhere.
+        timings["speculation_hit"] is the latency saved, timings["speculation_waste"] the work thrown away
+        and timings["speculation_wait"] the time spent waiting for unfinished speculative work after routing.
+        """
+        routed = time.monotonic()
+        if agent != "retriever":
+            speculation.task.cancel()
+            wasted = speculation.overlap(routed)
+            self.speculation_counts["misses"] += 1
+            self.speculation_seconds["wasted"] += wasted
+            state.add_timing("speculation_waste", wasted)
+            return
+        try:
+            state.speculation = await speculation.task
+        except Exception as e:
+            logger.warning(f"PlannerAgent._settle_speculation() | Speculative retrieval failed, retrieving normally: {e}")
+            self.speculation_counts["failures"] += 1
+            return
+        finally:
+            state.add_timing("speculation_wait", time.monotonic() - routed)
+        saved = speculation.overlap(routed)
+        self.speculation_counts["hits"] += 1
+        self.speculation_seconds["saved"] += saved
+        state.add_timing("speculation_hit", saved)
+
+    def speculation_stats(self) -> Dict[str, Any]:
+        """Hit and waste rates of speculative retrieval since startup."""
+        total = sum(self.speculation_counts.values())
+        return {
+            "enabled": self.speculator is not None,
+            **self.speculation_counts,
+            "hit_rate": self.speculation_counts["hits"] / total if total else 0.0,
+            "waste_rate": self.speculation_counts["misses"] / total if total else 0.0,
+            "saved_seconds": self.speculation_seconds["saved"],
+            "wasted_seconds": self.speculation_seconds["wasted"],
+        }
+
     def _normalize_agent_name(self, agent_name: str) -> str:
         """
         Normalize agent names to match graph node names.
@@ -125,16 +210,7 @@ class PlannerAgent:
         Returns:
             Normalized agent name
         """
-        # Map common variations to standard names
-        mappings = {
-            "search": "retriever",
-            "cart_node": "cart",
-            "product_finder": "retriever",
-            "general": "chatter",
-            "assistant": "chatter"
-        }
-        
-        normalized = mappings.get(agent_name, agent_name)
+        normalized = self.AGENT_ALIASES.get(agent_name, agent_name)
         
         # Ensure the normalized name is in our valid choices
         if normalized not in self.agent_choices:
@@ -143,7 +219,7 @@ class PlannerAgent:
         
         return normalized
 
-    def invoke(
+    async def invoke(
         self,
         state: State,
         verbose: bool = True
@@ -162,16 +238,37 @@ class PlannerAgent:
         logger.info(f"PlannerAgent.invoke() | Processing routing for query: {state.query}")
         
         output_state = state
+        speculation = None
         
         # Handle image-only queries
         if state.has_image() and state.is_empty_query():
             logger.info("PlannetAgent.invoke() | Image-only query detected, routing to retriever")
             response_content = "retriever"
         else:
-            # Use LLM to determine routing
-            # Note: We only pass the query, not the context, to avoid routing bias
-            query_string = f"USER QUERY: {state.query}" 
-            response_content = self._call_llm_for_routing(query_string)
+            # Try the local router first and only ask the LLM when it is not confident enough.
+            # Unless a rule settles the query at once, retrieval starts speculatively meanwhile.
+            decision = self.router.match_rules(state.query) if self.router else None
+            if not self._is_confident(decision):
+                if self.speculator is not None:
+                    speculation = Speculation(self.speculator.speculate(state.model_copy()))
+                if self.router:
+                    decision = await self.router.route(state.query, decision)
+            if self._is_confident(decision):
+                response_content = decision.agent
+                source = decision.source
+            else:
+                # Use LLM to determine routing
+                # Note: We only pass the query, not the context, to avoid routing bias
+                query_string = f"USER QUERY: {state.query}" 
+                response_content = await self._call_llm_for_routing(query_string, raw_query=state.query)
+                source = "llm"
+            
+            # Decision source and latency, e.g. timings["router_rule"]
+            output_state.add_timing(f"router_{source}", time.monotonic() - start_time)
+            logger.info(
+                f"PlannerAgent.invoke() | Routing decided by {source}"
+                + (f" (local: {decision.agent}, {decision.source}, confidence {decision.confidence:.2f})" if decision else "")
+            )
         
         # Normalize the agent name
         normalized_agent = self._normalize_agent_name(response_content)
@@ -181,6 +278,10 @@ class PlannerAgent:
         end_time = time.monotonic()
         output_state.add_timing("planner", end_time - start_time)
 
+        # The planner timing ends with the routing decision; waiting for speculative work is timed on its own.
+        if speculation is not None:
+            await self._settle_speculation(speculation, normalized_agent, output_state)
+
         logger.info(f"PlannerAgent.invoke() | Routed query to agent: {normalized_agent}")
         return output_state
 
@@ -9,15 +9,11 @@ the catalog retriever service to find relevant products.
 
 from .agenttypes import State
 from .functions import retrieval_extraction_function
-from openai import OpenAI
-import os
+from .upstream import UpstreamClients
 import json
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import httpx
 import sys
 from typing import Tuple, List, Dict, Any
-import asyncio
 import logging
 import time
 
@@ -35,6 +31,7 @@ class RetrieverAgent():
     def __init__(
         self,
         config,
+        upstreams: UpstreamClients | None = None,
     ) -> None:
         logging.info(f"RetrieverAgent.__init__() | Initializing with llm_name={config.llm_name}, llm_port={config.llm_port}")
         self.llm_name = config.llm_name
@@ -44,8 +41,10 @@ class RetrieverAgent():
         self.catalog_retriever_url = config.retriever_port
         self.k_value = config.top_k_retrieve
         self.categories = config.categories
+        self.upstreams = upstreams if upstreams is not None else UpstreamClients(config)
+        self.speculative_catalog_query = config.speculative_catalog_query
         
-        self.model = OpenAI(base_url=config.llm_port, api_key=os.environ["LLM_API_KEY"])
+        self.model = self.upstreams.llm_client("retriever")
         logging.info(f"RetrieverAgent.__init__() | Initialization complete")
 
     async def invoke(
@@ -58,70 +57,25 @@ class RetrieverAgent():
         """
         logging.info(f"RetrieverAgent.invoke() | Starting with query: {state.query}")
 
-        # Set our k value for retrieval.
-        k = self.k_value
-
-        # Get the user query and image from the state
-        image = state.image
+        # Inputs and results the planner computed speculatively while routing, if any
+        speculation = state.speculation
+        state.speculation = {}
 
         # Use the LLM to determine entities/categories/filters for retrieval
         start = time.monotonic()
-        entities, categories, filters = await self._extract_retrieval_inputs(state)
+        if speculation:
+            entities, categories, filters = speculation["entities"], speculation["categories"], speculation["filters"]
+        else:
+            entities, categories, filters = await self._extract_retrieval_inputs(state)
         end = time.monotonic()
         state.timings["retriever_categories"] = end - start
         
         # Query the catalog retriever service
         start = time.monotonic()
         try:
-
-            retry_strategy = Retry(
-                total=3,                    
-                status_forcelist=[422, 429, 500, 502, 503, 504],  
-                allowed_methods=["POST"],   
-                backoff_factor=1            
-            )
-            
-            adapter = HTTPAdapter(max_retries=retry_strategy)
-            session = requests.Session()
-            session.mount("https://", adapter)
-            session.mount("http://", adapter)
-
-            if image:
-                logging.info(
-                    "RetrieverAgent.invoke() | /query/image -- getting response.\n"
-                    f"\t| entities: {entities}\n"
-                    f"\t| categories: {categories}\n"
-                    f"\t| filters: {filters}"
-                )
-                response = session.post(
-                    f"{self.catalog_retriever_url}/query/image",
-                    json={
-                        "text": entities,
-                        "image_base64": image,
-                        "categories": categories,
-                        "filters": filters,
-                        "k": k
-                    }
-                )
-            else:
-                logging.info(
-                    "RetrieverAgent.invoke() | /query/text -- getting response\n"
-                    f"\t| query: {entities}\n"
-                    f"\t| categories: {categories}\n"
-                    f"\t| filters: {filters}"
-                )
-                response = session.post(
-                    f"{self.catalog_retriever_url}/query/text",
-                    json={
-                        "text": entities,
-                        "categories": categories,
-                        "filters": filters,
-                        "k": k
-                    }
-                )
-
-            response.raise_for_status()
-            results = response.json()
+            results = speculation.get("results")
+            if results is None:
+                results = await self._query_catalog(state.image, entities, categories, filters)
             
             # Format the response with product details
             if results["texts"]:
@@ -140,7 +94,7 @@ class RetrieverAgent():
             # Update context
             state.context = f"{state.context}\n{state.response}"
             
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
             if verbose:
                 logging.error(f"RetrieverAgent.invoke() | Error querying catalog retriever service: {str(e)}")
             state.response = "I encountered an error while searching for products. Please try again."
@@ -151,6 +105,82 @@ class RetrieverAgent():
 
         return state
 
+    async def speculate(self, state: State) -> Dict[str, Any]:
+        """
+        Compute retrieval inputs, and with speculative_catalog_query the catalog results,
+        before the planner has decided on the retriever. invoke() uses them from state.speculation.
+        """
+        entities, categories, filters = await self._extract_retrieval_inputs(state)
+        speculation: Dict[str, Any] = {"entities": entities, "categories": categories, "filters": filters}
+        if self.speculative_catalog_query:
+            try:
+                speculation["results"] = await self._query_catalog(state.image, entities, categories, filters)
+            except httpx.HTTPError as e:
+                # invoke() queries the catalog again and reports the error if it persists.
+                logging.warning(f"RetrieverAgent.speculate() | Speculative catalog query failed: {e}")
+        return speculation
+
+    async def _query_catalog(
+        self,
+        image: str | bytes,
+        entities: List[str],
+        categories: List[str],
+        filters: Dict[str, float],
+    ) -> Dict[str, Any]:
+        """Query the catalog retriever by text, or by image when there is one. Raises httpx.HTTPError."""
+        k = self.k_value
+        catalog = self.upstreams.catalog
+
+        if image:
+            logging.info(
+                "RetrieverAgent._query_catalog() | /query/image -- getting response.\n"
+                f"\t| entities: {entities}\n"
+                f"\t| categories: {categories}\n"
+                f"\t| filters: {filters}"
+            )
+            if isinstance(image, bytes):
+                # Forward raw uploads as multipart, so the image is never base64 encoded.
+                response = await catalog.post(
+                    "/query/image",
+                    data={
+                        "text": entities,
+                        "categories": categories,
+                        "filters": json.dumps(filters),
+                        "k": k
+                    },
+                    files={"image": ("image", image, "application/octet-stream")}
+                )
+            else:
+                response = await catalog.post(
+                    "/query/image",
+                    json={
+                        "text": entities,
+                        "image_base64": image,
+                        "categories": categories,
+                        "filters": filters,
+                        "k": k
+                    }
+                )
+        else:
+            logging.info(
+                "RetrieverAgent._query_catalog() | /query/text -- getting response\n"
+                f"\t| query: {entities}\n"
+                f"\t| categories: {categories}\n"
+                f"\t| filters: {filters}"
+            )
+            response = await catalog.post(
+                "/query/text",
+                json={
+                    "text": entities,
+                    "categories": categories,
+                    "filters": filters,
+                    "k": k
+                }
+            )
+
+        response.raise_for_status()
+        return response.json()
+
     async def _extract_retrieval_inputs(self, state: State) -> Tuple[List[str], List[str], Dict[str, float]]:
         """
         Extract retrieval entities, categories, and structured filters from the user request.
@@ -205,8 +235,7 @@ Available categories: {category_list_str}
 Apply the decision logic and extract retrieval inputs."""}
             ]
 
-            extraction_response = await asyncio.to_thread(
-                self.model.chat.completions.create,
+            extraction_response = await self.model.chat.completions.create(
                 model=self.llm_name,
                 messages=extraction_messages,
                 tools=[retrieval_extraction_function],
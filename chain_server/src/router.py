@@ -0,0 +1,251 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Local query router that runs ahead of the PlannerAgent's LLM call.
+
+Most queries are easy to route: greetings go to the chatter, anything about the cart to
+the cart agent, "show me dresses" to the retriever. QueryRouter tries two local stages:
+
+1. Keyword/regex rules, each with a fixed confidence.
+2. A nearest-centroid classifier over query embeddings. There is one centroid per agent,
+   trained with `python -m app.train_router` from logged LLM routing decisions.
+
+The planner accepts a local decision whose confidence reaches router_threshold. Otherwise
+it asks the LLM, and logs the LLM's decision so the next training run can learn from it.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Set
+import asyncio
+import json
+import logging
+import math
+import os
+import re
+import time
+
+from .upstream import UpstreamClients
+
+
+logger = logging.getLogger(__name__)
+
+# Training examples must come from the LLM, so the router never learns from itself.
+TRAINING_SOURCE = "llm"
+# Pronouns that point at a product already in the conversation, and product attributes:
+# "show me that in blue" or "what sizes do you have" are questions about a product the
+# user is looking at, not new searches.
+_FOLLOW_UP = re.compile(
+    r"\b(it|its|this|that|these|those|them|they|one|ones|"
+    r"sizes?|colou?rs?|materials?|fabric|price|cost|stock|care|wash(ing)?)\b"
+)
+
+
+@dataclass
+class RouteDecision:
+    """An agent choice, how sure the router is about it, and which stage made it."""
+    agent: str
+    confidence: float
+    source: str
+
+
+@dataclass
+class RoutingRule:
+    agent: str
+    pattern: re.Pattern
+    confidence: float
+    # Skip the rule when the query looks like a follow-up about a product.
+    skip_on_follow_up: bool = False
+
+    def matches(self, query: str) -> bool:
+        if self.skip_on_follow_up and _FOLLOW_UP.search(query):
+            return False
+        return bool(self.pattern.search(query))
+
+
+DEFAULT_RULES = [
+    # Anything about the cart itself: "what's in my cart", "clear the cart", "put it in the basket".
+    # "Basket" alone is also a product ("the basket shoulder bag", "basket bags"), so it needs
+    # a possessive or a preposition.
+    RoutingRule(
+        "cart",
+        re.compile(
+            r"\b(my|your|the|shopping) cart\b|\b(my|your|shopping) basket\b"
+            r"|\b(in|into|to|from|out of) (the |my |your )?(cart|basket)\b|^(cart|basket)[\s!.?]*$"
+        ),
+        0.95,
+    ),
+    # "add two of them", "remove the dress", "grab the first item".
+    RoutingRule("cart", re.compile(r"^(please |can you |could you )?(add|remove|delete|grab|take out)\b"), 0.85),
+    # Greetings, thanks and goodbyes with nothing else in them.
+    RoutingRule(
+        "chatter",
+        re.compile(
+            r"^(hi|hello|hey|hiya|howdy|good (morning|afternoon|evening)|thanks|thank you|"
+            r"thank you (so|very) much|thanks (a lot|so much)|bye|goodbye|see you|ok|okay|cool|great)"
+            r"( there)?( for (your|the) help)?[\s!.,?]*$"
+        ),
+        0.95,
+    ),
+    # New searches: "show me dresses", "do you have summer hats", "what bags do you sell".
+    RoutingRule(
+        "retriever",
+        re.compile(
+            r"^(please |can you |could you )?(show( me)?|find( me)?|search( for)?|browse|look(ing)? for|"
+            r"recommend|suggest|i('m| am) looking for)\b"
+            r"|\bdo you (have|sell|carry)\b"
+        ),
+        0.85,
+        skip_on_follow_up=True,
+    ),
+]
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class CentroidClassifier:
+    """
+    One unit-length centroid per agent. A query goes to the agent with the most similar
+    centroid. Confidence is the softmax of the cosine similarities at the given temperature.
+    """
+    def __init__(self, labels: List[str], centroids: List[List[float]], model: str, temperature: float = 0.05):
+        self.labels = labels
+        self.centroids = [_normalize(centroid) for centroid in centroids]
+        self.model = model
+        self.temperature = temperature
+
+    @classmethod
+    def train(cls, vectors: Sequence[Sequence[float]], labels: Sequence[str], model: str, temperature: float = 0.05) -> "CentroidClassifier":
+        """Average the normalized query vectors of each agent."""
+        sums: Dict[str, List[float]] = {}
+        for vector, label in zip(vectors, labels):
+            vector = _normalize(vector)
+            total = sums.setdefault(label, [0.0] * len(vector))
+            for i, value in enumerate(vector):
+                total[i] += value
+        names = sorted(sums)
+        return cls(names, [sums[name] for name in names], model=model, temperature=temperature)
+
+    @classmethod
+    def load(cls, path: str, temperature: float = 0.05) -> "CentroidClassifier":
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(data["labels"], data["centroids"], model=data["model"], temperature=temperature)
+
+    def save(self, path: str, examples: Dict[str, int] | None = None) -> None:
+        """Write the centroids as JSON, via a temporary file so readers never see a partial one."""
+        staging = f"{path}.tmp"
+        with open(staging, "w") as f:
+            json.dump({
+                "model": self.model,
+                "created_at": time.time(),
+                "examples": examples or {},
+                "labels": self.labels,
+                "centroids": self.centroids,
+            }, f)
+        os.replace(staging, path)
+
+    def predict(self, vector: Sequence[float]) -> RouteDecision:
+        vector = _normalize(vector)
+        similarities = [sum(a * b for a, b in zip(centroid, vector)) for centroid in self.centroids]
+        best = max(range(len(self.labels)), key=similarities.__getitem__)
+        weights = [math.exp((similarity - similarities[best]) / self.temperature) for similarity in similarities]
+        return RouteDecision(agent=self.labels[best], confidence=1.0 / sum(weights), source="centroid")
+
+
+class QueryRouter:
+    """Rules first, then the centroid classifier. Returns the best local decision, if any."""
+    def __init__(self, config, upstreams: UpstreamClients) -> None:
+        self.threshold = config.router_threshold
+        self.rules = [rule for rule in DEFAULT_RULES if rule.agent in config.agent_choices]
+        self.log_path = config.router_log_path
+        self.embed_model = config.router_embed_model
+        self.classifier: CentroidClassifier | None = None
+        self.embedder = None
+        # Decision log writes in flight, referenced until they finish.
+        self._log_writes: Set[asyncio.Task] = set()
+
+        path = config.router_centroids_path
+        if path and config.router_embed_port and os.path.exists(path):
+            classifier = CentroidClassifier.load(path, temperature=config.router_temperature)
+            if classifier.model != self.embed_model:
+                logger.warning(
+                    f"QueryRouter.__init__() | Centroids in {path} were trained with {classifier.model}, "
+                    f"not {self.embed_model}; the centroid classifier is disabled."
+                )
+            else:
+                keep = [i for i, label in enumerate(classifier.labels) if label in config.agent_choices]
+                classifier.labels = [classifier.labels[i] for i in keep]
+                classifier.centroids = [classifier.centroids[i] for i in keep]
+                self.classifier = classifier
+                self.embedder = upstreams.llm_client("router", base_url=config.router_embed_port)
+                logger.info(f"QueryRouter.__init__() | Loaded routing centroids for {classifier.labels} from {path}.")
+
+    def match_rules(self, query: str) -> Optional[RouteDecision]:
+        text = query.strip().lower()
+        for rule in self.rules:
+            if rule.matches(text):
+                return RouteDecision(agent=rule.agent, confidence=rule.confidence, source="rule")
+        return None
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        response = await self.embedder.embeddings.create(
+            input=texts,
+            model=self.embed_model,
+            encoding_format="float",
+            extra_body={"input_type": "query", "truncate": "END"},
+        )
+        return [item.embedding for item in response.data]
+
+    async def route(self, query: str, decision: Optional[RouteDecision]) -> Optional[RouteDecision]:
+        """
+        The most confident local decision, or None when no local stage has an answer.
+        decision is what match_rules() returned for the query, so the rules are not run twice.
+        """
+        if decision is not None and decision.confidence >= self.threshold:
+            return decision
+        if self.classifier is not None and self.classifier.labels:
+            try:
+                [vector] = await self.embed([query])
+                centroid_decision = self.classifier.predict(vector)
+                if decision is None or centroid_decision.confidence > decision.confidence:
+                    decision = centroid_decision
+            except Exception as e:
+                logger.warning(f"QueryRouter.route() | Query embedding failed, skipping the centroid classifier: {e}")
+        return decision
+
+    def log_decision(self, query: str, agent: str, source: str) -> None:
+        """
+        Append a routing decision to router_log_path, the training data of train_router.
+        The write runs in a worker thread in the background, so it never blocks the event loop
+        or adds to the turn's latency.
+        """
+        if not self.log_path or not query.strip():
+            return
+        line = json.dumps({"query": query, "agent": agent, "source": source, "timestamp": time.time()}) + "\n"
+        task = asyncio.get_running_loop().create_task(asyncio.to_thread(self._append_log_line, line))
+        self._log_writes.add(task)
+        task.add_done_callback(self._log_writes.discard)
+
+    def _append_log_line(self, line: str) -> None:
+        try:
+            with open(self.log_path, "a") as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning(f"QueryRouter.log_decision() | Could not write to {self.log_path}: {e}")
+
+
+def read_decisions(path: str, source: str = TRAINING_SOURCE) -> List[Dict[str, Any]]:
+    """Logged decisions made by source, keeping the latest label of every distinct query."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if entry.get("source") == source and entry.get("query", "").strip():
+                latest[entry["query"].strip().lower()] = entry
+    return list(latest.values())
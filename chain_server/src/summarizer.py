@@ -1,12 +1,11 @@
 # SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
 # SPDX-License-Identifier: Apache-2.0
 
-from openai import OpenAI
 from .agenttypes import State
 from .functions import summary_function
-import requests
+from .upstream import UpstreamClients
+import httpx
 import json
-import os
 import logging
 import sys
 import time
@@ -22,12 +21,13 @@ def setup_logging():
 # Configuration will be loaded by the main application
 
 class SummaryAgent:
-    def __init__(self, config):
+    def __init__(self, config, upstreams: UpstreamClients | None = None):
         """
         Initialize the SummaryAgent with LLM configuration.
         
         Args:
             config: Configuration instance
+            upstreams: Shared upstream HTTP clients; created from config if not given
         """
         logging.info(f"SummaryAgent.__init__() | Initializing with llm_name={config.llm_name}, llm_port={config.llm_port}")
         self.llm_name = config.llm_name
@@ -36,11 +36,12 @@ class SummaryAgent:
         # Store configuration
         self.memory_length = config.memory_length
         self.memory_port = config.memory_port
+        self.upstreams = upstreams if upstreams is not None else UpstreamClients(config)
         
-        self.model = OpenAI(base_url=config.llm_port, api_key=os.environ["LLM_API_KEY"])
+        self.model = self.upstreams.llm_client("summary")
         logging.info(f"SummaryAgent.__init__() | Initialization complete")
 
-    def invoke(
+    async def invoke(
         self, 
         state: State,
         verbose: bool = True
@@ -80,7 +81,7 @@ class SummaryAgent:
         start = time.monotonic()
         if len(state.context) > self.memory_length:
             logging.info(f"SummaryAgent.invoke() | Context length is greater than memory length")
-            response = self.model.chat.completions.create(
+            response = await self.model.chat.completions.create(
                 model=self.llm_name,
                 messages=messages,
                 tools=[summary_function],
@@ -96,7 +97,15 @@ class SummaryAgent:
         else:
             logging.info(f"SummaryAgent.invoke() | Context length is less than memory length -- writing to memory.")
         
-        requests.post(f"{self.memory_port}/user/{output_state.user_id}/context/replace", json={"new_context": output_state.context})
+        try:
+            # Replacing the context is idempotent, so it may be retried like a read.
+            await self.upstreams.memory.post(
+                f"/user/{output_state.user_id}/context/replace",
+                json={"new_context": output_state.context},
+                retry=True
+            )
+        except httpx.HTTPError as e:
+            logging.error(f"SummaryAgent.invoke() | Failed to write context to memory: {e}")
 
         end = time.monotonic()
         
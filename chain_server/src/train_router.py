@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+train-router: fit the local router's centroids to logged LLM routing decisions.
+
+The planner appends every LLM routing decision to router_log_path. This embeds the logged
+queries with router_embed_model and writes one centroid per agent to --output (by default
+router_centroids_path), which chain servers load on startup.
+
+    python -m app.train_router [--log decisions.jsonl] [--output centroids.json] [--config config.yaml]
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from collections import Counter
+
+from .config import load_config
+from .router import CentroidClassifier, QueryRouter, read_decisions
+from .upstream import UpstreamClients
+
+
+async def train(config, log_path: str, output: str, min_examples: int, batch_size: int) -> int:
+    decisions = read_decisions(log_path)
+    examples = Counter(decision["agent"] for decision in decisions)
+    kept = [decision for decision in decisions if examples[decision["agent"]] >= min_examples]
+    if not kept:
+        logging.error(f"train_router() | No agent has {min_examples} logged decisions in {log_path}.")
+        return 1
+
+    upstreams = UpstreamClients(config)
+    router = QueryRouter(config, upstreams)
+    router.embedder = upstreams.llm_client("router", base_url=config.router_embed_port)
+    try:
+        vectors = []
+        for start in range(0, len(kept), batch_size):
+            vectors.extend(await router.embed([decision["query"] for decision in kept[start:start + batch_size]]))
+    finally:
+        await upstreams.aclose()
+
+    classifier = CentroidClassifier.train(vectors, [decision["agent"] for decision in kept], model=config.router_embed_model)
+    classifier.save(output, examples={label: examples[label] for label in classifier.labels})
+    logging.info(f"train_router() | Wrote centroids for {dict(examples)} to {output}.")
+    print(output)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="train-router", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--config", default=None, help="chain_server config.yaml.")
+    parser.add_argument("--log", help="Routing decision log (defaults to router_log_path).")
+    parser.add_argument("--output", help="Centroid file (defaults to router_centroids_path).")
+    parser.add_argument("--min-examples", type=int, default=5, help="Agents with fewer logged decisions get no centroid.")
+    parser.add_argument("--batch-size", type=int, default=64, help="Queries per embedding request.")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    log_path = args.log or config.router_log_path
+    output = args.output or config.router_centroids_path
+    if not (log_path and output and config.router_embed_port):
+        parser.error("needs a decision log, an output path and router_embed_port in the config")
+    return asyncio.run(train(config, log_path, output, args.min_examples, args.batch_size))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Shared async HTTP clients for the services the chain server calls.
+
+One httpx.AsyncClient per upstream (memory retriever, catalog retriever, guardrails) lives
+for the lifetime of the application, so connections are kept alive and reused across
+requests, and every node and agent awaits its calls instead of blocking the event loop.
+Each upstream has its own connection limits, timeouts and retry policy (see UpstreamConfig).
+The agents' AsyncOpenAI clients share one more pooled transport to the LLM endpoint.
+"""
+from typing import Any, Dict
+import asyncio
+import logging
+import os
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from .config import UpstreamConfig
+
+
+logger = logging.getLogger(__name__)
+
+
+class UpstreamClient:
+    """A pooled async HTTP client for one upstream, with retries on transient failures."""
+
+    def __init__(self, name: str, base_url: str, policy: UpstreamConfig) -> None:
+        self.name = name
+        self.policy = policy
+        self.retry_methods = {method.upper() for method in policy.retry_methods}
+        self.retry_statuses = set(policy.retry_statuses)
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            limits=httpx.Limits(
+                max_connections=policy.max_connections,
+                max_keepalive_connections=policy.max_keepalive_connections,
+                keepalive_expiry=policy.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(policy.timeout, connect=policy.connect_timeout),
+        )
+
+    async def request(self, method: str, path: str, retry: bool | None = None, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request, retrying transport errors and retryable statuses with exponential backoff.
+        retry overrides whether the method is retried, e.g. for a POST that only reads.
+        The last response is returned as is; callers decide whether to raise_for_status().
+        """
+        if retry is None:
+            retry = method.upper() in self.retry_methods
+        attempts = 1 + (self.policy.retries if retry else 0)
+        for attempt in range(1, attempts + 1):
+            try:
+                response = await self.client.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"UpstreamClient.request() | {self.name} {method} {path} failed ({e!r}), retrying.")
+            else:
+                if response.status_code not in self.retry_statuses or attempt == attempts:
+                    return response
+                logger.warning(f"UpstreamClient.request() | {self.name} {method} {path} returned {response.status_code}, retrying.")
+                await response.aclose()
+            await asyncio.sleep(self.policy.backoff_factor * 2 ** (attempt - 1))
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+
+class UpstreamClients:
+    """The memory, catalog, rails and LLM clients shared by the graph and every agent."""
+
+    def __init__(self, config) -> None:
+        self.config = config
+        self.memory = UpstreamClient("memory", config.memory_port, config.upstreams["memory"])
+        self.catalog = UpstreamClient("catalog", config.retriever_port, config.upstreams["catalog"])
+        self.rails = UpstreamClient("rails", config.rails_port, config.upstreams["rails"])
+        llm = config.upstreams["llm"]
+        self.llm_http_client = DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=llm.max_connections,
+                max_keepalive_connections=llm.max_keepalive_connections,
+                keepalive_expiry=llm.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(llm.timeout, connect=llm.connect_timeout),
+        )
+
+    def llm_client(self, agent: str, base_url: str | None = None) -> AsyncOpenAI:
+        """
+        An AsyncOpenAI client for one agent, on the shared LLM connection pool, with its timeout.
+        base_url defaults to llm_port, e.g. for the router's embedding endpoint.
+        """
+        llm = self.config.upstreams["llm"]
+        timeout = self.config.llm_timeouts[agent]
+        return AsyncOpenAI(
+            base_url=base_url or self.config.llm_port,
+            api_key=os.environ["LLM_API_KEY"],
+            http_client=self.llm_http_client,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, llm.connect_timeout)),
+            max_retries=llm.retries,
+        )
+
+    def all(self) -> Dict[str, UpstreamClient]:
+        return {"memory": self.memory, "catalog": self.catalog, "rails": self.rails}
+
+    async def aclose(self) -> None:
+        """Close every pool, e.g. on application shutdown."""
+        await asyncio.gather(
+            *(client.aclose() for client in self.all().values()),
+            self.llm_http_client.aclose(),
+        )
+        logger.info("UpstreamClients.aclose() | Closed upstream HTTP clients.")
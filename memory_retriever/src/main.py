@@ -4,7 +4,7 @@
 import os
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy import Column, Integer, String, create_engine, literal, select
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import time
@@ -54,6 +54,25 @@ async def get_user(user_id: int):
         raise HTTPException(status_code=404, detail="User not found")
     return {"id": user.id, "context": user.context, "cart": [{"item": item.item, "amount": item.amount} for item in cart_items]}
 
+@app.get("/user/{user_id}/state")
+async def get_state(user_id: int):
+    """Context and cart of a user, read with one query in one session."""
+    requested = select(literal(user_id).label("id")).subquery()
+    query = (
+        select(User.context, CartItem.item, CartItem.amount)
+        .select_from(requested)
+        .outerjoin(User, User.id == requested.c.id)
+        .outerjoin(CartItem, CartItem.user_id == requested.c.id)
+        .order_by(CartItem.id)
+    )
+    with SessionLocal() as db:
+        rows = db.execute(query).all()
+    return {
+        "user_id": user_id,
+        "context": rows[0].context or "",
+        "cart": [{"item": row.item, "amount": row.amount} for row in rows if row.item is not None]
+    }
+
 @app.get("/user/{user_id}/cart")
 async def report_cart(user_id: int):
     db = SessionLocal()
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: Copyright (c) 2025 NVIDIA CORPORATION & AFFILIATES. All rights reserved.
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Micro-benchmark of the catalog retriever ranking step.
+
+Compares the former pure-Python merge in Retriever.retrieve() (sort, round-robin
+interleave with list.pop(0), seen-set dedupe, top-k window, threshold) against the
+vectorized strategies in catalog_retriever/src/ranking.py, on synthetic hit lists.
+
+The vectorized path applies the threshold before taking k, so a deeper search can
+backfill. On the fixtures every hit in the top-k window clears the threshold, so
+both orders must give the same results; the benchmark asserts that before timing.
+
+    python3 ranking_benchmark.py [--k 100] [--entities 10] [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "catalog_retriever", "src"))
+from ranking import Candidates, get_strategy, rank, top_k_by_score  # noqa: E402
+
+THRESHOLD = 0.3
+
+
+class Doc:
+    def __init__(self, pk):
+        self.metadata = {"pk": pk}
+
+
+def make_lists(k, entities, catalog_size, seed=0):
+    """One hit list of k * entities per entity, sorted by descending score, with overlapping products."""
+    rng = np.random.default_rng(seed)
+    docs = [Doc(pk) for pk in range(catalog_size)]
+    lists = []
+    for _ in range(entities):
+        pks = rng.choice(catalog_size, size=min(k * entities, catalog_size), replace=False)
+        scores = np.sort(rng.uniform(0.2, 0.9, size=len(pks)))[::-1]
+        lists.append([(docs[pk], float(score)) for pk, score in zip(pks, scores)])
+    return lists
+
+
+def legacy_round_robin(lists, k):
+    sorted_lists = [sorted(hits, key=lambda item: item[1], reverse=True) for hits in lists]
+    interleaved = []
+    active = [iter(hits) for hits in sorted_lists]
+    while active:
+        current = active.pop(0)
+        try:
+            interleaved.append(next(current))
+            active.append(current)
+        except StopIteration:
+            pass
+    seen, deduped = set(), []
+    for item in interleaved:
+        pk = str(item[0].metadata.get("pk"))
+        if pk not in seen:
+            seen.add(pk)
+            deduped.append(item)
+    ranked = [item for item in deduped[:k] if item[1] > THRESHOLD]
+    return sorted(ranked, key=lambda item: item[1], reverse=True)
+
+
+def vectorized(lists, k, strategy):
+    candidates = Candidates(lists)
+    order = rank(candidates, get_strategy(strategy), THRESHOLD)
+    return top_k_by_score(candidates, order[:k].tolist(), k)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=100)
+    parser.add_argument("--entities", type=int, default=10)
+    parser.add_argument("--catalog-size", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    lists = make_lists(args.k, args.entities, args.catalog_size)
+    candidates = sum(len(hits) for hits in lists)
+
+    fixtures = [(lists, args.k)] + [
+        (make_lists(k, entities, args.catalog_size, seed=seed), k)
+        for seed, (k, entities) in enumerate([(1, 1), (5, 3), (10, 1), (20, 5), (50, 2)], start=1)
+    ]
+    for fixture, k in fixtures:
+        assert vectorized(fixture, k, "round_robin") == legacy_round_robin(fixture, k), \
+            f"round_robin strategy diverges from the legacy ranking (k={k}, lists={len(fixture)})"
+
+    print(f"k={args.k} entities={args.entities} candidates={candidates} repeat={args.repeat}")
+    runs = [
+        ("legacy python round robin", lambda: legacy_round_robin(lists, args.k)),
+        ("vectorized round_robin", lambda: vectorized(lists, args.k, "round_robin")),
+        ("vectorized max_score", lambda: vectorized(lists, args.k, "max_score")),
+        ("vectorized rrf", lambda: vectorized(lists, args.k, "rrf")),
+    ]
+    for name, run in runs:
+        seconds = min(timeit.repeat(run, number=args.repeat, repeat=3)) / args.repeat
+        print(f"{name:<28} {seconds * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()